@@ -0,0 +1,197 @@
+"""Benchmark the autofill pipeline (discover -> match -> fill) without a browser.
+
+A fake WebDriver / DevTools connection answers the pipeline's scripts from a synthetic
+form and sleeps a fixed latency per call, so numbers reflect round trips the way a real
+browser would. Examples:
+
+    python bench_autofill.py
+    python bench_autofill.py --inputs 10,100 --fields 50 --latency-ms 3 --engines legacy,selenium,cdp
+    python bench_autofill.py --typed "Mật khẩu" --json > bench_output.txt
+    python bench_autofill.py --cache      # repeat fills served from a warm SelectorCache
+"""
+import argparse, json, random, time
+
+import main
+
+# ---------------- Synthetic forms ----------------
+FILLER_WORDS = ["ghi chú", "mã giới thiệu", "captcha", "địa chỉ", "tỉnh", "quận", "zip", "company",
+                "website", "mã khuyến mãi", "câu hỏi", "search", "nickname", "fax", "title"]
+
+def make_field_map(n_fields: int, rng: random.Random) -> dict:
+    """DEFAULT_FIELD_KEYWORDS plus synthetic fields up to n_fields (4 keywords each)."""
+    field_map = {k: list(v) for k, v in main.DEFAULT_FIELD_KEYWORDS.items()}
+    i = 0
+    while len(field_map) < n_fields:
+        field_map[f"Trường {i}"] = [f"kw{i}_{j}_{rng.randrange(10**6)}" for j in range(4)]
+        i += 1
+    return field_map
+
+def make_form(n_inputs: int, field_map: dict, rng: random.Random) -> list:
+    """Snapshot-shaped input dicts; one input per field (while room) hidden among filler inputs."""
+    fields = list(field_map)
+    inputs = []
+    for i in range(n_inputs):
+        info = {"placeholder": "", "ng_model": "", "name": "", "id": f"f{i}", "type": "text", "label": "", "visible": True}
+        if i < len(fields):
+            kw = rng.choice(field_map[fields[i]])
+            info["placeholder"] = f"Nhập {kw}"
+            info["ng_model"] = f"form.{kw.replace(' ', '_')}"
+        else:
+            word = rng.choice(FILLER_WORDS)
+            info["placeholder"] = f"{word} {i}"
+            info["ng_model"] = f"form.extra{i}"
+            info["name"] = f"extra{i}"
+        info["handle"] = [[f"#f{i}", 0]]
+        inputs.append(info)
+    rng.shuffle(inputs)
+    return inputs
+
+# ---------------- Fake transports ----------------
+class FakePage:
+    """Answers the pipeline's scripts from a synthetic form, sleeping `latency` per round trip."""
+    origin, signature = "http://bench.test", "00000000:0"
+
+    def __init__(self, form: list, latency: float):
+        self.form = form
+        self.latency = latency
+        self.round_trips = 0
+
+    def answer(self, script: str, args: list):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if script == main.SNAPSHOT_JS:
+            hit = main.SelectorCache.key(self.origin, self.signature) in (args[0] if args else [])
+            return {"origin": self.origin, "signature": self.signature, "hit": hit,
+                    "inputs": [] if hit else [dict(info) for info in self.form]}
+        if script == main.BATCH_FILL_JS:
+            return [{"ok": True, "error": ""} for _ in args[0]]
+        return True
+
+class FakeElement:
+    def __init__(self, page: FakePage, info: dict):
+        self.page = page
+        self.info = info
+
+    def get_attribute(self, name):
+        self.page.answer("get_attribute", [])
+        return self.info.get(name.replace("-", "_"))
+
+    def clear(self):
+        self.page.answer("clear", [])
+
+    def send_keys(self, *keys):
+        self.page.answer("send_keys", [])
+
+class FakeDriver(FakePage):
+    """Enough of selenium's WebDriver for SeleniumSession and the legacy loop."""
+    def execute_script(self, script, *args):
+        return self.answer(script, list(args))
+
+    def execute(self, command, params=None):  # ActionChains.perform()
+        self.answer(command, [])
+        return {"value": None}
+
+    def find_elements(self, by, value):
+        self.answer("find_elements", [])
+        return [FakeElement(self, info) for info in self.form]
+
+class FakeCdpConnection(FakePage):
+    """Enough of CdpConnection for CdpSession: one call() per protocol message."""
+    def call(self, method: str, **params):
+        if method != "Runtime.evaluate":
+            self.answer(method, [])
+            return {}
+        expr = params["expression"]
+        body, _, args = expr.rpartition("\n}).apply(null, ")
+        script = body[len("(function(){"):]
+        value = self.answer(script, json.loads(args[:-1]))
+        return {"result": {"type": "object", "value": value}}
+
+# ---------------- Engines under test ----------------
+def run_legacy(page: FakeDriver, profile: dict, field_map: dict) -> int:
+    """The pre-snapshot App.autofill loop: get_attribute per input per field, send_keys per field."""
+    all_inputs = page.find_elements("xpath", "//input | //textarea")
+    for el in all_inputs:  # debug dump
+        el.get_attribute("placeholder"), el.get_attribute("ng-model")
+    filled = 0
+    for field, keywords in field_map.items():
+        val = (profile.get(field) or "").strip()
+        if not val:
+            continue
+        for el in all_inputs:
+            placeholder = (el.get_attribute("placeholder") or "").lower()
+            ng_model = (el.get_attribute("ng-model") or "").lower()
+            if any(k.lower() in placeholder or k.lower() in ng_model for k in keywords):
+                el.clear()
+                el.send_keys("ctrl+a")
+                el.send_keys("delete")
+                el.send_keys(val)
+                filled += 1
+                break
+    return filled
+
+def run_session(engine: str, form: list, latency: float, profile: dict, matcher, typed_fields, cache=None):
+    if engine == "selenium":
+        session = main.SeleniumSession(0)
+        page = session.driver = FakeDriver(form, latency)
+    else:
+        session = main.CdpSession(0)
+        page = session.conn = FakeCdpConnection(form, latency)
+    res = session.autofill(profile, matcher, typed_fields, log=lambda *a: None, cache=cache)
+    return page, len(res["filled"])
+
+def bench(engine: str, n_inputs: int, n_fields: int, latency: float, typed_fields=(), repeat: int = 3,
+          seed: int = 1, cache: bool = False) -> dict:
+    rng = random.Random(seed)
+    field_map = make_field_map(n_fields, rng)
+    form = make_form(n_inputs, field_map, rng)
+    profile = {f: f"value-{i}" for i, f in enumerate(field_map)}
+    matcher = main.KeywordMatcher(field_map)
+    selector_cache = None
+    if cache and engine != "legacy":
+        selector_cache = main.SelectorCache(path=None)
+        run_session(engine, form, 0, profile, matcher, typed_fields, selector_cache)  # làm nóng cache
+
+    times, round_trips, matched = [], 0, 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        if engine == "legacy":
+            page = FakeDriver(form, latency)
+            matched = run_legacy(page, profile, field_map)
+        else:
+            page, matched = run_session(engine, form, latency, profile, matcher, typed_fields, selector_cache)
+        times.append(time.perf_counter() - t0)
+        round_trips = page.round_trips
+    wall = min(times)
+    return {"engine": engine + ("+cache" if selector_cache else ""), "inputs": n_inputs, "fields": len(field_map), "latency_ms": latency * 1000,
+            "round_trips": round_trips, "wall_s": round(wall, 4), "matched": matched,
+            "matches_per_s": round(matched / wall, 1) if wall else None}
+
+def main_cli(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--inputs", default="10,100,1000", help="comma-separated form sizes")
+    ap.add_argument("--fields", type=int, default=len(main.DEFAULT_FIELD_KEYWORDS), help="field_map size")
+    ap.add_argument("--latency-ms", type=float, default=2.0, help="simulated latency per round trip")
+    ap.add_argument("--engines", default="selenium,cdp",
+                    help="selenium, cdp and/or legacy (the old per-attribute loop; slow on big forms)")
+    ap.add_argument("--typed", default="", help="comma-separated fields filled with real typing")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per case (best is reported)")
+    ap.add_argument("--cache", action="store_true", help="fill through a warm SelectorCache (repeat-visit path)")
+    ap.add_argument("--json", action="store_true", help="one JSON object per line instead of a table")
+    args = ap.parse_args(argv)
+
+    typed = [f for f in args.typed.split(",") if f]
+    rows = [bench(engine, int(n), args.fields, args.latency_ms / 1000, typed, args.repeat, cache=args.cache)
+            for n in args.inputs.split(",") for engine in args.engines.split(",")]
+    if args.json:
+        for r in rows:
+            print(json.dumps(r, ensure_ascii=False))
+        return
+    cols = ["engine", "inputs", "fields", "round_trips", "wall_s", "matched", "matches_per_s"]
+    print("  ".join(f"{c:>14}" for c in cols))
+    for r in rows:
+        print("  ".join(f"{str(r[c]):>14}" for c in cols))
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,780 @@
+import queue, threading
+from concurrent.futures import Future
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+
+from main import (AutofillCancelled, BrowserScanner, DEFAULT_FIELD_KEYWORDS, ENGINES, FIELDS,
+                  KeywordMatcher, OPTIONS_FILE, ProfileStore, SETTINGS_FILE, SelectorCache,
+                  SeleniumSession, SessionPool, enable_tracing, ensure_file_json,
+                  iter_profile_file, load_options, pair_assignments, run_batch, run_in_background,
+                  run_tabs, save_json)
+
+# =============== Window helpers ===============
+def center_window(win, master=None):
+    """Canh giữa cửa sổ `win` so với `master` (cha)"""
+    win.update_idletasks()
+    if master is None:
+        master = win.master
+
+    # Lấy toạ độ và kích thước cửa sổ cha
+    x = master.winfo_rootx()
+    y = master.winfo_rooty()
+    w = master.winfo_width()
+    h = master.winfo_height()
+
+    # Lấy kích thước popup
+    ww = win.winfo_width()
+    wh = win.winfo_height()
+
+    # Tính toán vị trí
+    xpos = x + (w - ww) // 2
+    ypos = y + (h - wh) // 2
+
+    win.geometry(f"{ww}x{wh}+{xpos}+{ypos}")
+
+def show_error(title: str, message: str, parent=None):
+    messagebox.showerror(title, message, parent=parent)
+
+# =============== Widgets ===============
+class VirtualTable(ttk.Frame):
+    """Treeview that only materializes the `height` rows in view.
+
+    Holds an ordered list of row ids; `fetch_rows(ids) -> {id: values}` is called for the
+    visible window only. Selection is kept as a set of ids so it survives scrolling.
+    """
+    def __init__(self, master, columns, fetch_rows, height: int = 10, on_select=None):
+        super().__init__(master)
+        self.fetch_rows = fetch_rows
+        self.height = height
+        self.on_select = on_select
+        self.ids, self.pos = [], {}
+        self.offset = 0
+        self.selected = set()
+        self.columnconfigure(0, weight=1)
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.sb = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.sb.grid(row=0, column=1, sticky="ns")
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<ButtonPress-1>", self._on_press, add="+")
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(1, "units"))
+        self.tree.bind("<Up>", lambda e: self._on_press(e) or self._step(-1, e))
+        self.tree.bind("<Down>", lambda e: self._on_press(e) or self._step(1, e))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-1, "pages"))
+        self.tree.bind("<Next>", lambda e: self.scroll(1, "pages"))
+
+    def heading(self, column, **kw):
+        self.tree.heading(column, **kw)
+
+    def column(self, column, **kw):
+        self.tree.column(column, **kw)
+
+    # ---- data ----
+    def set_ids(self, ids):
+        """Replace the row list (e.g. new search result); keeps selection of ids still present."""
+        self.ids = list(ids)
+        self.pos = {rid: i for i, rid in enumerate(self.ids)}
+        self.selected &= self.pos.keys()
+        self.offset = 0
+        self.render()
+
+    def append(self, rid):
+        self.pos[rid] = len(self.ids)
+        self.ids.append(rid)
+        self.see(rid)
+
+    def remove(self, rid):
+        i = self.pos.pop(rid, None)
+        if i is None:
+            return
+        del self.ids[i]
+        for j in range(i, len(self.ids)):
+            self.pos[self.ids[j]] = j
+        self.selected.discard(rid)
+        self.render()
+
+    def refresh_row(self, rid):
+        """Re-fetch one row in place (no-op if it is scrolled out of view)."""
+        if self.tree.exists(str(rid)):
+            values = self.fetch_rows([rid]).get(rid)
+            if values is not None:
+                self.tree.item(str(rid), values=values)
+
+    # ---- selection ----
+    def selection(self) -> list:
+        return sorted(self.selected, key=self.pos.__getitem__)
+
+    def select(self, rid):
+        self.selected = {rid}
+        self.see(rid)
+        self._notify()
+
+    def see(self, rid):
+        i = self.pos.get(rid)
+        if i is not None and not self.offset <= i < self.offset + self.height:
+            self.offset = max(0, i - self.height + 1) if i >= self.offset else i
+        self.render()
+
+    MODIFIER_MASK = 0x0001 | 0x0004  # Shift | Control
+
+    def _on_press(self, event):
+        """A click/arrow key without Ctrl/Shift starts a new selection: forget rows scrolled out of view."""
+        if not event.state & self.MODIFIER_MASK:
+            self.selected &= {int(iid) for iid in self.tree.get_children()}
+
+    def _on_tree_select(self, event=None):
+        # Cũng chạy khi render() gọi selection_set: hàng đã chọn nhưng đang khuất luôn được giữ
+        visible = {int(iid) for iid in self.tree.get_children()}
+        selected = (self.selected - visible) | {int(iid) for iid in self.tree.selection()}
+        if selected != self.selected:
+            self.selected = selected
+            self._notify()
+
+    def _notify(self):
+        if self.on_select:
+            self.on_select()
+
+    # ---- scrolling ----
+    def render(self):
+        self.offset = max(0, min(self.offset, len(self.ids) - self.height))
+        window = self.ids[self.offset:self.offset + self.height]
+        rows = self.fetch_rows(window)
+        self.tree.delete(*self.tree.get_children())
+        for rid in window:
+            if rid in rows:
+                self.tree.insert("", "end", iid=str(rid), values=rows[rid])
+        self.tree.selection_set([str(rid) for rid in window if rid in self.selected and rid in rows])
+        n = len(self.ids)
+        self.sb.set(self.offset / n if n else 0, (self.offset + len(window)) / n if n else 1)
+
+    def scroll(self, n: int, what: str = "units"):
+        self.offset += n * (self.height if what == "pages" else 1)
+        self.render()
+        return "break"
+
+    def yview(self, *args):
+        if args and args[0] == "moveto":
+            self.offset = int(float(args[1]) * len(self.ids))
+            self.render()
+        elif args and args[0] == "scroll":
+            self.scroll(int(args[1]), "pages" if args[2].startswith("page") else "units")
+
+    def _step(self, delta: int, event=None):
+        """Arrow keys past the first/last visible row scroll the window instead of stopping."""
+        focus = self.tree.focus()
+        i = self.pos.get(int(focus)) if focus else None
+        if i is None:
+            return None
+        j = i + delta
+        if self.offset <= j < self.offset + self.height or not 0 <= j < len(self.ids):
+            return None  # Treeview tự xử lý trong cửa sổ đang hiện
+        if event is not None and event.state & self.MODIFIER_MASK:
+            self.selected.add(self.ids[j])
+            self.see(self.ids[j])
+            self._notify()
+        else:
+            self.select(self.ids[j])
+        self.tree.focus(str(self.ids[j]))
+        return "break"
+
+# =============== Dialogs ===============
+class ProfileForm(tk.Toplevel):
+    """Add / Edit profile"""
+    def __init__(self, master, initial=None):
+        super().__init__(master)
+        self.title("Hồ sơ")
+        self.resizable(False, False)
+        self.result = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        frm = ttk.Frame(self, padding=10)
+        frm.pack(fill="both", expand=True)
+
+        self.vars = {}
+        for i, field in enumerate(FIELDS):
+            ttk.Label(frm, text=field).grid(row=i, column=0, sticky="w", padx=4, pady=3)
+            var = tk.StringVar(value=(initial.get(field, "") if initial else ""))
+            ent = ttk.Entry(frm, textvariable=var, width=36, show="*" if "khẩu" in field.upper() or field == "PIN" else "")
+            ent.grid(row=i, column=1, sticky="w", padx=4, pady=3)
+            self.vars[field] = var
+
+        btns = ttk.Frame(frm)
+        btns.grid(row=len(FIELDS), column=0, columnspan=2, pady=(10, 0))
+        ttk.Button(btns, text="Lưu", command=self.on_ok).pack(side="left", padx=5)
+        ttk.Button(btns, text="Huỷ", command=self.on_close).pack(side="left", padx=5)
+
+        self.bind("<Return>", lambda e: self.on_ok())
+        self.grab_set()
+        self.transient(master)
+        self.focus()
+        center_window(self, master)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_ok(self):
+        data = {f: self.vars[f].get() for f in FIELDS}
+        self.result = data
+        self.destroy()
+    def on_close(self):
+        self.result = None
+        self.destroy()    
+
+class FieldMapEditor(tk.Toplevel):
+    """Edit settings.json: field -> keywords list (+ typed_fields in options.json)"""
+    def __init__(self, master, settings: dict, options: dict):
+        super().__init__(master)
+        self.title("Cài đặt nhận dạng trường")
+        self.geometry("580x420")
+        self.settings = {k: list(v) for k, v in settings.items()}
+        self.options = dict(options)
+        self.typed_fields = set(self.options.get("typed_fields", []))
+        self.result = None
+        self.current_field = None
+        
+
+        left = ttk.Frame(self, padding=6); left.pack(side="left", fill="y")
+        right = ttk.Frame(self, padding=6); right.pack(side="right", fill="both", expand=True)
+
+        ttk.Label(left, text="Trường").pack(anchor="w")
+        self.list_fields = tk.Listbox(left, height=20, exportselection=False)
+        self.list_fields.pack(fill="y", expand=False)
+        for f in FIELDS:
+            self.list_fields.insert("end", f)
+        self.list_fields.bind("<<ListboxSelect>>", self.on_select_field)
+        self.list_fields.selection_set(0)
+
+        ttk.Label(right, text="Từ khoá (mỗi dòng một từ)").pack(anchor="w")
+        self.txt_keywords = tk.Text(right, height=15, exportselection=False)
+        self.txt_keywords.pack(fill="both", expand=True)
+
+        self.var_typed = tk.BooleanVar(value=False)
+        ttk.Checkbutton(right, text="Gõ phím thật (send_keys) thay vì điền nhanh bằng JS",
+                        variable=self.var_typed).pack(anchor="w", pady=(6, 0))
+
+        btns = ttk.Frame(right); btns.pack(fill="x", pady=6)
+        ttk.Button(btns, text="Lưu thay đổi", command=self.save_current).pack(side="left", padx=4)
+
+        self.on_select_field(None)
+        self.grab_set(); self.transient(master)
+        center_window(self, master)
+
+    def on_select_field(self, _):
+        idx = self.list_fields.curselection()
+        if not idx:
+            return
+        field = self.list_fields.get(idx[0])
+
+        self.current_field = field   # 👈 thêm dòng này để nhớ lại trường đang chọn
+
+        self.txt_keywords.delete("1.0", "end")
+        self.txt_keywords.insert("1.0", "\n".join(self.settings.get(field, [])))
+        self.var_typed.set(field in self.typed_fields)
+
+    def save_current(self):
+        if not self.current_field:
+            messagebox.showwarning("Chưa chọn trường", "Vui lòng chọn một trường ở danh sách bên trái trước khi lưu.", parent=self)
+            return
+
+        field = self.current_field
+        raw = self.txt_keywords.get("1.0", "end-1c")
+        arr = [x.strip() for x in raw.splitlines() if x.strip()]
+        self.settings[field] = arr
+
+        if self.var_typed.get():
+            self.typed_fields.add(field)
+        else:
+            self.typed_fields.discard(field)
+        self.options["typed_fields"] = [f for f in FIELDS if f in self.typed_fields]
+
+        save_json(SETTINGS_FILE, self.settings)
+        save_json(OPTIONS_FILE, self.options)
+        self.result = self.settings
+
+        messagebox.showinfo("Đã lưu", f"Đã cập nhật từ khoá cho '{field}'.", parent=self)
+    
+    def on_close(self):
+        # KHÔNG gọi save_current nữa
+        self.result = None
+        self.destroy()
+
+class BatchResultWindow(tk.Toplevel):
+    """Summary table for a batch autofill run"""
+    def __init__(self, master, rows: list):
+        super().__init__(master)
+        self.title("Kết quả autofill hàng loạt")
+        self.geometry("760x360")
+
+        cols = ("port", "url", "profile", "filled", "not_found", "error", "seconds")
+        heads = ("Port", "Tab", "Hồ sơ", "Đã điền", "Chưa tìm thấy", "Lỗi", "Giây")
+        tbl = ttk.Treeview(self, columns=cols, show="headings")
+        for c, h in zip(cols, heads):
+            tbl.heading(c, text=h)
+            tbl.column(c, width=60 if c in ("port", "seconds") else 150, anchor="w")
+        # Cột Tab chỉ hiện khi điền theo từng tab
+        tbl["displaycolumns"] = cols if any("url" in r for r in rows) else tuple(c for c in cols if c != "url")
+        tbl.pack(fill="both", expand=True, padx=8, pady=8)
+        for r in rows:
+            tbl.insert("", "end", values=(r["port"], r.get("url", ""), r["profile"], len(r["filled"]),
+                                          ", ".join(r["not_found"]), r["error"], r["seconds"]))
+
+        ok = sum(1 for r in rows if not r["error"])
+        ttk.Label(self, text=f"Thành công {ok}/{len(rows)}").pack(anchor="w", padx=8, pady=(0, 8))
+        self.transient(master)
+        center_window(self, master)
+
+# =============== Main App ===============
+class App(tk.Tk):
+    def __init__(self):
+        super().__init__()
+        self.title("Autofill By Sum")
+        self.geometry("775x615")
+
+        # Data
+        self.store = ProfileStore()
+        self.field_map = ensure_file_json(SETTINGS_FILE, DEFAULT_FIELD_KEYWORDS)
+        self.matcher = KeywordMatcher(self.field_map)
+        self.options = load_options()
+        if self.options.get("trace"):
+            enable_tracing()
+        self.selector_cache = (SelectorCache(maxsize=int(self.options.get("selector_cache_size") or 200))
+                               if self.options.get("selector_cache") else None)
+        self.browsers = {}        # iid -> browser entry
+        self.browser_icons = {}   # iid -> ImageTk.PhotoImage (giữ tham chiếu)
+        self.sessions = SessionPool(ENGINES.get(self.options.get("engine"), SeleniumSession))
+        self.fill_job = None       # Future của lần autofill đang chạy
+        self.fill_profile_id = None  # id hồ sơ đang được điền (để hiện trạng thái từng trường)
+        self.fill_status = {}      # field -> (status, detail)
+
+        # ---- Menu ----
+        menubar = tk.Menu(self)
+        m_profile = tk.Menu(menubar, tearoff=0)
+        m_profile.add_command(label="Thêm hồ sơ", command=self.add_profile)
+        m_profile.add_command(label="Sửa hồ sơ", command=self.edit_profile)
+        m_profile.add_command(label="Xoá hồ sơ", command=self.delete_profile)
+        m_profile.add_separator()
+        m_profile.add_command(label="Import JSON...", command=self.import_profiles)
+        m_profile.add_command(label="Export JSON...", command=self.export_profiles)
+        menubar.add_cascade(label="Hồ sơ", menu=m_profile)
+
+        m_setting = tk.Menu(menubar, tearoff=0)
+        m_setting.add_command(label="Nhận dạng trường", command=self.open_field_map_editor)
+        self.var_trace_overlay = tk.BooleanVar(value=bool(self.options.get("trace_overlay")))
+        m_setting.add_checkbutton(label="Hiện thời gian từng bước", variable=self.var_trace_overlay,
+                                  command=self.toggle_trace_overlay)
+        menubar.add_cascade(label="Cài đặt", menu=m_setting)
+        self.config(menu=menubar)
+
+        # ---- Layout ----
+        self.columnconfigure(1, weight=1)
+        self.rowconfigure(1, weight=1)
+
+        # Left: Browser list (with icons)
+        frm_left = ttk.Frame(self, padding=8)
+        frm_left.grid(row=0, column=0, rowspan=2, sticky="nsw")
+        ttk.Label(frm_left, text="Browser đang chạy:", font=("Segoe UI", 10, "bold")).pack(anchor="w")
+
+        self.browser_tree = ttk.Treeview(frm_left, show="tree", height=20)
+        self.browser_tree.pack(fill="both", expand=False, pady=(4, 6), padx=(0, 4))
+
+        ttk.Button(frm_left, text="🔍 Quét Browser", command=self.scan_browsers).pack(fill="x", pady=(0, 6))
+
+        frm_engine = ttk.Frame(frm_left)
+        frm_engine.pack(fill="x", pady=(0, 6))
+        ttk.Label(frm_engine, text="Engine:").pack(side="left")
+        self.var_engine = tk.StringVar(value=self.options.get("engine") if self.options.get("engine") in ENGINES else "selenium")
+        cb_engine = ttk.Combobox(frm_engine, textvariable=self.var_engine, values=list(ENGINES), state="readonly", width=10)
+        cb_engine.pack(side="left", padx=(4, 0))
+        cb_engine.bind("<<ComboboxSelected>>", lambda e: self.set_engine(self.var_engine.get()))
+        ttk.Button(frm_left, text="⚡ Autofill hồ sơ đã chọn", command=self.autofill).pack(fill="x")
+        ttk.Button(frm_left, text="⚡⚡ Autofill hàng loạt", command=self.autofill_batch).pack(fill="x", pady=(6, 0))
+        ttk.Button(frm_left, text="🗂 Autofill mọi tab", command=self.autofill_tabs).pack(fill="x", pady=(6, 0))
+        self.btn_cancel_fill = ttk.Button(frm_left, text="⛔ Huỷ autofill", command=self.cancel_autofill, state="disabled")
+        self.btn_cancel_fill.pack(fill="x", pady=(6, 0))
+
+        self.var_trace_scan = tk.StringVar(value="")
+        ttk.Label(frm_left, textvariable=self.var_trace_scan, foreground="gray", wraplength=220).pack(anchor="w", pady=(6, 0))
+
+        # Right top: Profiles table
+        frm_right_top = ttk.Frame(self, padding=(8, 8, 8, 4))
+        frm_right_top.grid(row=0, column=1, sticky="nsew")
+        frm_right_top.columnconfigure(0, weight=1)
+        frm_title = ttk.Frame(frm_right_top)
+        frm_title.grid(row=0, column=0, sticky="ew")
+        frm_title.columnconfigure(2, weight=1)
+        ttk.Label(frm_title, text="Hồ sơ", font=("Segoe UI", 10, "bold")).grid(row=0, column=0, sticky="w")
+        ttk.Label(frm_title, text="🔎").grid(row=0, column=1, sticky="e", padx=(16, 2))
+        self.var_search = tk.StringVar()
+        ttk.Entry(frm_title, textvariable=self.var_search).grid(row=0, column=2, sticky="ew")
+        self.var_search.trace_add("write", lambda *a: self.schedule_profile_search())
+        self.var_profile_count = tk.StringVar(value="")
+        ttk.Label(frm_title, textvariable=self.var_profile_count, foreground="gray").grid(row=0, column=3, padx=(6, 0))
+        self.search_job = None
+
+        self.tbl = VirtualTable(frm_right_top, columns=("Họ tên", "Tài khoản", "SĐT"),
+                                fetch_rows=self.store.rows, height=10, on_select=self.show_profile_detail)
+        for c in ("Họ tên", "Tài khoản", "SĐT"):
+            self.tbl.heading(c, text=c)
+            self.tbl.column(c, width=180 if c == "Họ tên" else 160, anchor="center")
+        self.tbl.grid(row=1, column=0, sticky="nsew", pady=(4, 6))
+
+        btns = ttk.Frame(frm_right_top)
+        btns.grid(row=2, column=0, sticky="w", pady=(0, 6))
+        ttk.Button(btns, text="Thêm", command=self.add_profile).pack(side="left", padx=3)
+        ttk.Button(btns, text="Sửa", command=self.edit_profile).pack(side="left", padx=3)
+        ttk.Button(btns, text="Xoá", command=self.delete_profile).pack(side="left", padx=3)
+
+        # Right bottom: profile detail (key/value)
+        frm_right_bottom = ttk.Frame(self, padding=(8, 0, 8, 8))
+        frm_right_bottom.grid(row=1, column=1, sticky="nsew")
+        frm_right_bottom.columnconfigure(0, weight=1)
+        ttk.Label(frm_right_bottom, text="Chi tiết hồ sơ", font=("Segoe UI", 10, "bold")).grid(row=0, column=0, sticky="w")
+
+        self.detail = ttk.Treeview(frm_right_bottom, columns=("field", "value", "status"), show="headings", height=10)
+        self.detail.heading("field", text="Trường")
+        self.detail.heading("value", text="Giá trị")
+        self.detail.heading("status", text="Autofill")
+        self.detail.column("field", width=160, anchor="w")
+        self.detail.column("value", width=340, anchor="w")
+        self.detail.column("status", width=200, anchor="w")
+        self.detail.grid(row=1, column=0, sticky="nsew", pady=(4, 0))
+
+        self.var_fill_status = tk.StringVar(value="")
+        ttk.Label(frm_right_bottom, textvariable=self.var_fill_status).grid(row=2, column=0, sticky="w", pady=(4, 0))
+        self.var_trace_fill = tk.StringVar(value="")
+        ttk.Label(frm_right_bottom, textvariable=self.var_trace_fill, foreground="gray").grid(row=3, column=0, sticky="w")
+
+        self.refresh_profile_table()
+
+        # Quét nền: lần đầu ngay khi mở, sau đó tự làm mới theo scan_interval
+        self.scanner = BrowserScanner(interval=float(self.options.get("scan_interval") or 0))
+        self.scanner.start()
+        self.after(200, self.poll_browser_scan)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    # ---------- Profiles CRUD ----------
+    def refresh_profile_table(self):
+        """Re-run the current search; only the visible rows are loaded into the table."""
+        self.search_job = None
+        ids = self.store.search(self.var_search.get())
+        self.tbl.set_ids(ids)
+        self.update_profile_count()
+        self.show_profile_detail()
+
+    def update_profile_count(self):
+        shown, total = len(self.tbl.ids), self.store.count()
+        self.var_profile_count.set(f"{shown}/{total}" if shown != total else str(total))
+
+    def schedule_profile_search(self):
+        # Gõ liên tục -> chỉ tìm 1 lần sau khi dừng gõ
+        if self.search_job:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(200, self.refresh_profile_table)
+
+    def current_profile_id(self):
+        sel = self.tbl.selection()
+        return sel[0] if sel else None
+
+    def current_profile(self):
+        pid = self.current_profile_id()
+        return None if pid is None else self.store.get(pid)
+
+    def selected_profiles(self) -> list:
+        return [p for p in (self.store.get(pid) for pid in self.tbl.selection()) if p is not None]
+
+    def show_profile_detail(self):
+        self.detail.delete(*self.detail.get_children())
+        pid = self.current_profile_id()
+        p = self.current_profile()
+        if p is None:
+            return
+        status = self.fill_status if pid == self.fill_profile_id else {}
+        for f in FIELDS:
+            self.detail.insert("", "end", iid=f, values=(f, p.get(f, ""), self.fill_status_text(status.get(f))))
+
+    FILL_STATUS_TEXT = {"filling": "⏳ đang điền", "filled": "✅ đã điền", "not_found": "⚠️ không thấy ô",
+                        "failed": "❌ lỗi", "cancelled": "⛔ đã huỷ"}
+
+    def fill_status_text(self, st) -> str:
+        if not st:
+            return ""
+        status, detail = st
+        text = self.FILL_STATUS_TEXT.get(status, status)
+        return f"{text} ({detail})" if detail else text
+
+    def add_profile(self):
+        dlg = ProfileForm(self)
+        self.wait_window(dlg)
+        if dlg.result:
+            pid = self.store.add(dlg.result)
+            self.tbl.append(pid)
+            self.tbl.select(pid)
+            self.update_profile_count()
+
+    def edit_profile(self):
+        pid = self.current_profile_id()
+        if pid is None:
+            messagebox.showinfo("Chọn hồ sơ", "Hãy chọn 1 hồ sơ để sửa.", parent=self)
+            return
+        dlg = ProfileForm(self, initial=self.current_profile())
+        self.wait_window(dlg)
+        if dlg.result:
+            self.store.update(pid, dlg.result)
+            self.tbl.refresh_row(pid)
+            self.show_profile_detail()
+
+    def delete_profile(self):
+        pid = self.current_profile_id()
+        if pid is None:
+            return
+        if messagebox.askyesno("Xác nhận", "Xoá hồ sơ đã chọn?", parent=self):
+            self.store.delete(pid)
+            self.tbl.remove(pid)
+            self.update_profile_count()
+            self.show_profile_detail()
+
+    PROFILE_FILETYPES = [("JSON", "*.json"), ("JSON Lines", "*.jsonl"), ("CSV", "*.csv")]
+
+    def import_profiles(self):
+        path = filedialog.askopenfilename(filetypes=[("Hồ sơ", "*.json *.jsonl *.ndjson *.csv")] + self.PROFILE_FILETYPES)
+        if not path: return
+        self.run_profile_io(
+            lambda: self.store.import_records(iter_profile_file(path)),
+            lambda c: f"Đã import: {c['inserted']} mới, {c['updated']} cập nhật, {c['skipped']} bỏ qua.")
+
+    def export_profiles(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=self.PROFILE_FILETYPES)
+        if not path: return
+        self.run_profile_io(lambda: self.store.export(path), lambda n: f"Đã export {n} hồ sơ.")
+
+    def run_profile_io(self, job, message):
+        """Run an import/export job off the UI thread, then refresh the table and report."""
+        self.config(cursor="watch")
+        fut = run_in_background(job)
+
+        def wait():
+            if not fut.done():
+                self.after(200, wait)
+                return
+            self.config(cursor="")
+            self.refresh_profile_table()
+            try:
+                messagebox.showinfo("OK", message(fut.result()), parent=self)
+            except Exception as e:
+                show_error("Lỗi", str(e), parent=self)
+        wait()
+
+    # ---------- Settings editor ----------
+    def open_field_map_editor(self):
+        dlg = FieldMapEditor(self, self.field_map, self.options)
+        self.wait_window(dlg)
+        if dlg.result:
+            self.field_map = dlg.result
+            self.options = dlg.options
+            self.matcher = KeywordMatcher(self.field_map)
+
+    # ---------- Browsers ----------
+    EMPTY_BROWSER_IID = "__empty__"
+
+    def scan_browsers(self):
+        self.scanner.request_scan()
+
+    def poll_browser_scan(self):
+        try:
+            while True:
+                self.apply_browser_diff(*self.scanner.events.get_nowait())
+                if self.var_trace_overlay.get() and self.scanner.last_trace:
+                    self.var_trace_scan.set("Quét: " + self.scanner.last_trace.summary())
+        except queue.Empty:
+            pass
+        self.after(200, self.poll_browser_scan)
+
+    def apply_browser_diff(self, added, removed, changed):
+        tree = self.browser_tree
+        for iid in removed:
+            self.browsers.pop(iid, None)
+            self.browser_icons.pop(iid, None)
+            if tree.exists(iid):
+                tree.delete(iid)
+        # show with icon + title
+        for iid, b in added:
+            self.browsers[iid] = b
+            if b.get("icon") is not None:
+                from PIL import ImageTk
+                self.browser_icons[iid] = ImageTk.PhotoImage(b["icon"])
+            tree.insert("", "end", iid=iid, text=self.browser_label(b), image=self.browser_icons.get(iid, ""))
+        for iid, b in changed:
+            self.browsers[iid] = b
+            tree.item(iid, text=self.browser_label(b))
+
+        if self.browsers and tree.exists(self.EMPTY_BROWSER_IID):
+            tree.delete(self.EMPTY_BROWSER_IID)
+        elif not self.browsers and not tree.exists(self.EMPTY_BROWSER_IID):
+            tree.insert("", "end", iid=self.EMPTY_BROWSER_IID,
+                        text="(Không tìm thấy browser nào có --remote-debugging-port)")
+
+    @staticmethod
+    def browser_label(b) -> str:
+        return f"{b['name']} | {b['title'] or '(no title)'} (port {b['port']})"
+
+    def selected_browser(self):
+        sel = self.browser_tree.selection()
+        if not sel:
+            return None
+        return self.browsers.get(sel[0])
+
+    def set_engine(self, engine: str):
+        if engine == self.options.get("engine"):
+            return
+        self.options["engine"] = engine
+        save_json(OPTIONS_FILE, self.options)
+        old, self.sessions = self.sessions, SessionPool(ENGINES[engine])
+        old.close_all()
+
+    def toggle_trace_overlay(self):
+        self.options["trace_overlay"] = self.var_trace_overlay.get()
+        save_json(OPTIONS_FILE, self.options)
+        if not self.options["trace_overlay"]:
+            self.var_trace_scan.set("")
+            self.var_trace_fill.set("")
+
+    def selected_browsers(self) -> list:
+        return [self.browsers[iid] for iid in self.browser_tree.selection() if iid in self.browsers]
+
+    def on_close(self):
+        if self.fill_job is not None:
+            self.fill_cancel.set()
+        self.scanner.stop()
+        self.sessions.close_all()
+        self.store.close()
+        self.destroy()
+
+               # ---------- Autofill ----------
+    def fill_hooks(self) -> dict:
+        return {"cache": self.selector_cache, "ready_timeout": float(self.options.get("ready_timeout") or 0)}
+
+    def autofill(self):
+        b = self.selected_browser()
+        if not b:
+            show_error("Lỗi", "Hãy chọn một browser ở khung bên trái.", parent=self)
+            return
+
+        pid, profile = self.current_profile_id(), self.current_profile()
+        if profile is None:
+            show_error("Lỗi", "Hãy chọn một hồ sơ để autofill.", parent=self)
+            return
+
+        if self.fill_job is not None:
+            messagebox.showinfo("Đang chạy", "Autofill trước chưa xong, hãy chờ hoặc bấm Huỷ.", parent=self)
+            return
+
+        # Chạy ở luồng nền; tiến trình đi qua queue, UI rút ra bằng after()
+        events, cancel = queue.Queue(), threading.Event()
+        port, typed_fields = b["port"], list(self.options["typed_fields"])
+        self.fill_events, self.fill_cancel, self.fill_port = events, cancel, port
+        self.fill_profile_id, self.fill_status = pid, {}
+        self.show_profile_detail()
+        self.var_fill_status.set(f"Đang attach port {port}...")
+        self.btn_cancel_fill.state(["!disabled"])
+        self.fill_job = run_in_background(
+            lambda: self.sessions.autofill(port, profile, self.matcher, typed_fields,
+                                           progress=lambda event, data: events.put((event, data)),
+                                           cancel=cancel, **self.fill_hooks()))
+        self.after(100, self.poll_autofill)
+
+    def cancel_autofill(self):
+        if self.fill_job is not None:
+            self.fill_cancel.set()
+            self.var_fill_status.set("Đang huỷ...")
+
+    def poll_autofill(self):
+        try:
+            while True:
+                self.on_fill_event(*self.fill_events.get_nowait())
+        except queue.Empty:
+            pass
+        if not self.fill_job.done():
+            self.after(100, self.poll_autofill)
+            return
+
+        job, self.fill_job = self.fill_job, None
+        self.btn_cancel_fill.state(["disabled"])
+        try:
+            job.result()
+        except AutofillCancelled:
+            for f, (status, _) in list(self.fill_status.items()):
+                if status == "filling":
+                    self.on_fill_event("field", {"field": f, "status": "cancelled", "detail": ""})
+            self.var_fill_status.set("⛔ Đã huỷ autofill.")
+        except Exception as e:
+            self.sessions.drop(self.fill_port)
+            self.var_fill_status.set("❌ Autofill lỗi.")
+            show_error("Không thể kết nối", f"Không attach được {self.options.get('engine')}: {e}", parent=self)
+
+    def on_fill_event(self, event: str, data: dict):
+        if event == "attached":
+            self.var_fill_status.set(f"Đã attach port {data['port']}, đang quét form...")
+        elif event == "waiting":
+            self.var_fill_status.set(f"Đang chờ form hiện ra (tối đa {data['timeout']:g}s)...")
+        elif event == "inputs":
+            self.var_fill_status.set(f"Tìm thấy {data['count']} ô nhập, đang điền...")
+        elif event == "field":
+            field = data["field"]
+            self.fill_status[field] = (data["status"], data["detail"])
+            if self.detail.exists(field) and self.current_profile_id() == self.fill_profile_id:
+                self.detail.set(field, "status", self.fill_status_text(self.fill_status[field]))
+        elif event == "trace":
+            if self.var_trace_overlay.get():
+                self.var_trace_fill.set(data["summary"])
+        elif event == "done":
+            res = data["result"]
+            total = len(res["filled"]) + len(res["not_found"])
+            self.var_fill_status.set(f"✅ Xong: đã điền {len(res['filled'])}/{total} trường.")
+
+    def autofill_batch(self):
+        """Ghép các browser đang chọn (hoặc tất cả) với các hồ sơ đang chọn theo thứ tự rồi điền song song."""
+        browsers = self.selected_browsers() or list(self.browsers.values())
+        profiles = self.selected_profiles()
+        assignments = pair_assignments([b["port"] for b in browsers], profiles)
+        if not assignments:
+            show_error("Lỗi", "Hãy chọn các hồ sơ (Ctrl/Shift + click) và ít nhất một browser.", parent=self)
+            return
+
+        hooks = self.fill_hooks()
+        fut = run_in_background(
+            lambda: run_batch(assignments, self.matcher, self.options["typed_fields"],
+                              self.sessions, int(self.options.get("batch_workers") or 4), **hooks))
+
+        self.show_batch_result(fut)
+
+    def autofill_tabs(self):
+        """Điền mọi tab (URL khớp tab_url_pattern) của browser đang chọn: 1 hồ sơ cho mọi tab, hoặc nhiều hồ sơ theo thứ tự tab."""
+        b = self.selected_browser()
+        profiles = self.selected_profiles()
+        if not b or not profiles:
+            show_error("Lỗi", "Hãy chọn một browser và ít nhất một hồ sơ.", parent=self)
+            return
+
+        pattern, hooks = self.options.get("tab_url_pattern") or "", self.fill_hooks()
+        fut = run_in_background(
+            lambda: run_tabs(b["port"], profiles[0] if len(profiles) == 1 else profiles, self.matcher,
+                             self.options["typed_fields"], pattern,
+                             int(self.options.get("batch_workers") or 4), **hooks))
+        self.show_batch_result(fut, f"Không có tab nào khớp '{pattern}' trên port {b['port']}." if pattern
+                               else f"Không có tab nào trên port {b['port']}.")
+
+    def show_batch_result(self, fut: Future, empty_message: str = ""):
+        """Chờ Future của run_batch/run_tabs rồi mở bảng kết quả."""
+        def wait():
+            if not fut.done():
+                self.after(200, wait)
+                return
+            try:
+                rows = fut.result()
+                if not rows and empty_message:
+                    show_error("Lỗi", empty_message, parent=self)
+                else:
+                    BatchResultWindow(self, rows)
+            except Exception as e:
+                show_error("Lỗi", str(e), parent=self)
+        wait()
@@ -1,16 +1,38 @@
-import os, json, re, psutil, requests, sys
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-from tkinter.simpledialog import askstring
-from PIL import Image, ImageTk
-import win32gui, win32process, win32con, win32ui
-
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+import os, json, re, sys, queue, threading, time, logging, sqlite3, csv, hashlib, argparse
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict
+# selenium, requests, psutil, PIL, numpy, pywin32 được import khi cần (lazy) để cửa sổ
+# mở nhanh hơn (nhất là bản exe onefile) và module import được trên Linux
 
 # =============== Files & Defaults ===============
 PROFILES_FILE = "profiles.json"
+PROFILES_DB = "profiles.db"
 SETTINGS_FILE = "settings.json"
+OPTIONS_FILE = "options.json"
+
+DEFAULT_OPTIONS = {
+    # Trường nhập bằng send_keys thật thay vì điền hàng loạt bằng JS
+    "typed_fields": [],
+    # Chu kỳ tự quét lại browser (giây), 0 = chỉ quét khi bấm nút
+    "scan_interval": 5,
+    # Số browser được autofill song song ở chế độ hàng loạt
+    "batch_workers": 4,
+    # "selenium" (chromedriver) hoặc "cdp" (nói chuyện thẳng với DevTools websocket)
+    "engine": "selenium",
+    # Ghi thời gian từng bước vào autofill_trace.jsonl / hiện tóm tắt trên giao diện
+    "trace": True,
+    "trace_overlay": False,
+    # Nhớ selector theo origin + chữ ký form (selector_cache.json), số form tối đa
+    "selector_cache": True,
+    "selector_cache_size": 200,
+    # Chờ tối đa bao nhiêu giây cho form SPA render xong trước khi quét (0 = quét ngay)
+    "ready_timeout": 10,
+    # Autofill mọi tab: chỉ điền tab có URL khớp regex này ("" = mọi tab)
+    "tab_url_pattern": "",
+}
 
 FIELDS = [
     "Tài khoản", "Mật khẩu", "Nhập lại mật khẩu", "Họ tên",
@@ -29,29 +51,6 @@ DEFAULT_FIELD_KEYWORDS = {
     "Ngân hàng": ["bank", "ten_ngan_hang"],
     "Chi nhánh": ["branch", "branch_name", "chi_nhanh"]
 }
-# =============== Window helpers ===============
-def center_window(win, master=None):
-    """Canh giữa cửa sổ `win` so với `master` (cha)"""
-    win.update_idletasks()
-    if master is None:
-        master = win.master
-
-    # Lấy toạ độ và kích thước cửa sổ cha
-    x = master.winfo_rootx()
-    y = master.winfo_rooty()
-    w = master.winfo_width()
-    h = master.winfo_height()
-
-    # Lấy kích thước popup
-    ww = win.winfo_width()
-    wh = win.winfo_height()
-
-    # Tính toán vị trí
-    xpos = x + (w - ww) // 2
-    ypos = y + (h - wh) // 2
-
-    win.geometry(f"{ww}x{wh}+{xpos}+{ypos}")
-
 # =============== IO Helpers ===============
 def ensure_file_json(path: str, default_obj):
     if not os.path.exists(path):
@@ -67,56 +66,598 @@ def save_json(path: str, obj):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(obj, f, indent=2, ensure_ascii=False)
 
-# =============== Windows helpers (title + icon) ===============
-def get_window_title_from_pid(pid: int) -> str:
-    titles = []
-
-    def callback(hwnd, _):
+def load_options() -> dict:
+    opts = dict(DEFAULT_OPTIONS)
+    data = ensure_file_json(OPTIONS_FILE, DEFAULT_OPTIONS)
+    if isinstance(data, dict):
+        opts.update(data)
+    return opts
+
+def iter_json_array(f, chunk_size: int = 1 << 16):
+    """Yield the items of a top-level JSON array from text file `f`, reading `chunk_size` chars at a time."""
+    decoder = json.JSONDecoder()
+    buf, pos, started, eof = "", 0, False, False
+    while True:
+        # Bỏ khoảng trắng / dấu phẩy giữa các phần tử
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("File không hợp lệ (phải là mảng JSON).")
+                started, pos = True, pos + 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                # Số có thể bị cắt ngang ở cuối chunk ("2." của "2.5"): chỉ tin kết quả khi ký tự
+                # kế tiếp (bỏ khoảng trắng) đã có trong buffer và là ',' hoặc ']'
+                nxt = end
+                while nxt < len(buf) and buf[nxt] in " \t\r\n":
+                    nxt += 1
+                if nxt < len(buf) and buf[nxt] in ",]":
+                    yield item
+                    pos = end
+                    continue
+                if eof:
+                    if nxt < len(buf):
+                        raise ValueError(f"JSON không hợp lệ gần ký tự {buf[nxt]!r}.")
+                    yield item
+                    pos = end
+                    continue
+        elif eof:
+            if started:
+                raise ValueError("Mảng JSON chưa đóng (thiếu ']').")
+            return
+        data = f.read(chunk_size)
+        eof = not data
+        buf, pos = buf[pos:] + data, 0
+
+def iter_profile_file(path: str):
+    """Stream profile dicts from a JSON array, JSONL (.jsonl/.ndjson or .json starting with '{') or CSV file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                yield {k.strip(): (v or "").strip() for k, v in row.items() if k}
+        return
+    with open(path, "r", encoding="utf-8-sig") as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if ext in (".jsonl", ".ndjson") or head == "{":
+            for n, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        raise ValueError(f"Dòng {n}: {e}") from None
+        else:
+            yield from iter_json_array(f)
+
+def write_profile_file(path: str, profiles, fieldnames=None):
+    """Stream `profiles` to JSON array / JSONL / CSV (by extension) via a temp file, then replace `path`.
+
+    CSV needs `fieldnames` up front (the header); extra keys are dropped.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    tmp = path + ".tmp"
+    n = 0
+    try:
+        with open(tmp, "w", encoding="utf-8-sig" if ext == ".csv" else "utf-8", newline="") as f:
+            if ext == ".csv":
+                w = csv.DictWriter(f, fieldnames=fieldnames or FIELDS, extrasaction="ignore")
+                w.writeheader()
+                for p in profiles:
+                    w.writerow(p)
+                    n += 1
+            elif ext in (".jsonl", ".ndjson"):
+                for p in profiles:
+                    f.write(json.dumps(p, ensure_ascii=False) + "\n")
+                    n += 1
+            else:
+                f.write("[")
+                for p in profiles:
+                    f.write(("," if n else "") + "\n  " + json.dumps(p, ensure_ascii=False))
+                    n += 1
+                f.write("\n]\n")
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return n
+
+# =============== Profile store (SQLite) ===============
+# Cột được index để tra cứu nhanh; toàn bộ hồ sơ vẫn nằm trong `data` (JSON)
+PROFILE_INDEX_COLUMNS = {"Tài khoản": "account", "SĐT": "phone", "Email": "email", "Họ tên": "name"}
+# Khoá nhận diện trùng khi import, theo thứ tự ưu tiên
+PROFILE_DEDUPE_FIELDS = ("Tài khoản", "SĐT", "Email")
+
+class ProfileStore:
+    """Profiles in sqlite3, one row per profile; each add/update/delete is its own transaction.
+
+    On first open, an existing profiles.json is migrated once (recorded in the meta table).
+    """
+    def __init__(self, path: str = PROFILES_DB, legacy_json: str = PROFILES_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        cols = ", ".join(f"{c} TEXT" for c in PROFILE_INDEX_COLUMNS.values())
+        with self.conn:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS profiles (id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL, {cols})")
+            for c in PROFILE_INDEX_COLUMNS.values():
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_profiles_{c} ON profiles({c})")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.fts = self._create_search_index()
+        if legacy_json:
+            self.migrate_json(legacy_json)
+
+    def _create_search_index(self) -> bool:
+        """FTS5 trigram index over the indexed columns (substring search); False if sqlite lacks it."""
+        cols = ", ".join(PROFILE_INDEX_COLUMNS.values())
+        new = ", ".join(f"new.{c}" for c in PROFILE_INDEX_COLUMNS.values())
+        old = ", ".join(f"old.{c}" for c in PROFILE_INDEX_COLUMNS.values())
+        existed = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'profiles_fts'").fetchone()
         try:
-            tid, current_pid = win32process.GetWindowThreadProcessId(hwnd)
-            if current_pid == pid and win32gui.IsWindowVisible(hwnd):
-                title = win32gui.GetWindowText(hwnd)
-                if title.strip():
-                    titles.append(title)
-        except Exception:
-            pass
+            with self.conn:
+                self.conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS profiles_fts USING fts5({cols}, "
+                                  "content='profiles', content_rowid='id', tokenize='trigram')")
+                self.conn.execute(f"CREATE TRIGGER IF NOT EXISTS profiles_ai AFTER INSERT ON profiles BEGIN "
+                                  f"INSERT INTO profiles_fts(rowid, {cols}) VALUES (new.id, {new}); END")
+                self.conn.execute(f"CREATE TRIGGER IF NOT EXISTS profiles_ad AFTER DELETE ON profiles BEGIN "
+                                  f"INSERT INTO profiles_fts(profiles_fts, rowid, {cols}) VALUES ('delete', old.id, {old}); END")
+                self.conn.execute(f"CREATE TRIGGER IF NOT EXISTS profiles_au AFTER UPDATE ON profiles BEGIN "
+                                  f"INSERT INTO profiles_fts(profiles_fts, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+                                  f"INSERT INTO profiles_fts(rowid, {cols}) VALUES (new.id, {new}); END")
+                if not existed:
+                    self.conn.execute("INSERT INTO profiles_fts(profiles_fts) VALUES ('rebuild')")
+        except sqlite3.OperationalError:  # sqlite < 3.34: không có trigram -> LIKE
+            return False
+        return True
+
+    @staticmethod
+    def _row(profile: dict) -> tuple:
+        data = json.dumps(profile, ensure_ascii=False)
+        return (data,) + tuple(str(profile.get(f) or "").strip() for f in PROFILE_INDEX_COLUMNS)
+
+    def migrate_json(self, path: str) -> int:
+        """Import `path` (a JSON array) once; later opens skip it even if the file is still there."""
+        key = "migrated:" + os.path.abspath(path)
+        with self._lock:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return 0
+            data = []
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    try:
+                        data = json.load(f)
+                    except ValueError:
+                        pass
+            return self.add_many(data if isinstance(data, list) else [], _meta=(key, "done"))
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def ids(self) -> list:
+        with self._lock:
+            return [r[0] for r in self.conn.execute("SELECT id FROM profiles ORDER BY id")]
+
+    def search(self, query: str) -> list:
+        """Ids (ascending) whose name, account, phone or email contains `query`, case-insensitively.
+
+        Queries of 3+ characters go through the trigram index; shorter ones (or no FTS5) use LIKE.
+        """
+        query = query.strip()
+        if not query:
+            return self.ids()
+        if self.fts and len(query) >= 3:
+            sql, params = ("SELECT rowid FROM profiles_fts WHERE profiles_fts MATCH ? ORDER BY rowid",
+                           ('"' + query.replace('"', '""') + '"',))
+        else:
+            like = "%" + re.sub(r"([\\%_])", r"\\\1", query) + "%"
+            where = " OR ".join(f"{c} LIKE ? ESCAPE '\\'" for c in PROFILE_INDEX_COLUMNS.values())
+            sql, params = f"SELECT id FROM profiles WHERE {where} ORDER BY id", (like,) * len(PROFILE_INDEX_COLUMNS)
+        with self._lock:
+            return [r[0] for r in self.conn.execute(sql, params)]
+
+    def rows(self, ids) -> dict:
+        """{id: (Họ tên, Tài khoản, SĐT)} straight from the indexed columns, for table display."""
+        ids = list(ids)
+        if not ids:
+            return {}
+        with self._lock:
+            cur = self.conn.execute(f"SELECT id, name, account, phone FROM profiles WHERE id IN ({', '.join('?' * len(ids))})", ids)
+            return {r[0]: r[1:] for r in cur}
+
+    def get(self, profile_id: int):
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM profiles WHERE id = ?", (profile_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_all(self, batch: int = 1000):
+        """Yield (id, profile) in id order, `batch` rows per query (keyset paging, bounded memory)."""
+        last = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute("SELECT id, data FROM profiles WHERE id > ? ORDER BY id LIMIT ?",
+                                         (last, batch)).fetchall()
+            if not rows:
+                return
+            for pid, data in rows:
+                yield pid, json.loads(data)
+            last = rows[-1][0]
+
+    def add(self, profile: dict) -> int:
+        with self._lock, self.conn:
+            cur = self.conn.execute(f"INSERT INTO profiles (data, {', '.join(PROFILE_INDEX_COLUMNS.values())}) "
+                                    f"VALUES (?{', ?' * len(PROFILE_INDEX_COLUMNS)})", self._row(profile))
+            return cur.lastrowid
+
+    def add_many(self, profiles, _meta=None) -> int:
+        """Insert all dict items in one transaction; returns how many were inserted."""
+        rows = [self._row(p) for p in profiles if isinstance(p, dict)]
+        with self._lock, self.conn:
+            self.conn.executemany(f"INSERT INTO profiles (data, {', '.join(PROFILE_INDEX_COLUMNS.values())}) "
+                                  f"VALUES (?{', ?' * len(PROFILE_INDEX_COLUMNS)})", rows)
+            if _meta:
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", _meta)
+        return len(rows)
+
+    def find_duplicate(self, profile: dict):
+        """(id, data) of the first profile sharing account, phone or email with `profile` (in that order).
+
+        Phone/email only match a profile whose account is empty or the same as `profile`'s, so a
+        record with another account is never merged into someone else's profile.
+        """
+        key = PROFILE_DEDUPE_FIELDS[0]
+        account = str(profile.get(key) or "").strip()
+        for field in PROFILE_DEDUPE_FIELDS:
+            value = str(profile.get(field) or "").strip()
+            if value:
+                sql, params = f"SELECT id, data FROM profiles WHERE {PROFILE_INDEX_COLUMNS[field]} = ?", (value,)
+                if account and field != key:
+                    sql += f" AND COALESCE({PROFILE_INDEX_COLUMNS[key]}, '') IN ('', ?)"
+                    params += (account,)
+                with self._lock:
+                    row = self.conn.execute(sql + " ORDER BY id LIMIT 1", params).fetchone()
+                if row:
+                    return row[0], json.loads(row[1])
+        return None
 
-    win32gui.EnumWindows(callback, None)
-    return titles[0] if titles else ""
+    def import_records(self, records, batch: int = 1000, progress=None) -> dict:
+        """Upsert a stream of profile dicts, committing every `batch` records.
+
+        A record matching an existing profile (find_duplicate) is merged into it: "updated" if
+        that changes anything, "skipped" otherwise; empty and non-dict records are skipped too.
+        Reading/parsing `records` happens outside the lock, which is only held per batch, so the
+        Tk thread's reads are not blocked for the whole import.
+        """
+        counts = {"inserted": 0, "updated": 0, "skipped": 0}
+        chunk = []
+        for rec in records:
+            if not isinstance(rec, dict) or not any(str(v or "").strip() for v in rec.values()):
+                counts["skipped"] += 1
+                continue
+            chunk.append(rec)
+            if len(chunk) >= batch:
+                self._import_chunk(chunk, counts)
+                chunk = []
+                if progress:
+                    progress(counts)
+        if chunk:
+            self._import_chunk(chunk, counts)
+        return counts
+
+    def _import_chunk(self, chunk: list, counts: dict):
+        """Upsert one batch in its own transaction; a failing batch is rolled back whole, earlier ones stay."""
+        cols = ", ".join(PROFILE_INDEX_COLUMNS.values())
+        sets = ", ".join(f"{c} = ?" for c in PROFILE_INDEX_COLUMNS.values())
+        done = dict.fromkeys(counts, 0)
+        with self._lock, self.conn:
+            for rec in chunk:
+                dup = self.find_duplicate(rec)
+                if dup is None:
+                    self.conn.execute(f"INSERT INTO profiles (data, {cols}) VALUES (?{', ?' * len(PROFILE_INDEX_COLUMNS)})",
+                                      self._row(rec))
+                    done["inserted"] += 1
+                else:
+                    pid, old = dup
+                    merged = dict(old)
+                    merged.update({k: v for k, v in rec.items() if str(v or "").strip()})
+                    if merged == old:
+                        done["skipped"] += 1
+                    else:
+                        self.conn.execute(f"UPDATE profiles SET data = ?, {sets} WHERE id = ?", self._row(merged) + (pid,))
+                        done["updated"] += 1
+        for k, v in done.items():
+            counts[k] += v
+
+    def export(self, path: str) -> int:
+        """Stream every profile to `path` (format by extension); returns the number written."""
+        fieldnames = None
+        if os.path.splitext(path)[1].lower() == ".csv":
+            extra = {}
+            for _, p in self.iter_all():
+                extra.update(dict.fromkeys(k for k in p if k not in FIELDS))
+            fieldnames = list(FIELDS) + list(extra)
+        return write_profile_file(path, (p for _, p in self.iter_all()), fieldnames)
+
+    def update(self, profile_id: int, profile: dict):
+        sets = ", ".join(f"{c} = ?" for c in PROFILE_INDEX_COLUMNS.values())
+        with self._lock, self.conn:
+            self.conn.execute(f"UPDATE profiles SET data = ?, {sets} WHERE id = ?", self._row(profile) + (profile_id,))
+
+    def delete(self, profile_id: int):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM profiles WHERE id = ?", (profile_id,))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+# =============== Tracing ===============
+TRACE_FILE = "autofill_trace.jsonl"
+SELECTOR_CACHE_FILE = "selector_cache.json"
+TRACE_MAX_BYTES = 2 * 1024 * 1024
+TRACE_BACKUPS = 3
+
+trace_log = logging.getLogger("autofill.trace")
+trace_log.propagate = False
+
+def enable_tracing(path: str = TRACE_FILE):
+    """Send finished traces to a rotating JSONL file (one run per line)."""
+    if not trace_log.handlers:
+        handler = RotatingFileHandler(path, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUPS,
+                                      encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        trace_log.addHandler(handler)
+        trace_log.setLevel(logging.INFO)
+
+class Tracer:
+    """Timing spans for one scan or autofill run.
+
+    `span(name, **counts)` yields its counts dict so the caller can fill it in; if `round_trips`
+    (a callable returning the session's counter) is given, each span also records how many
+    WebDriver/CDP calls it made. `finish()` writes the run to the trace log.
+    """
+    def __init__(self, kind: str, round_trips=None, **attrs):
+        self.kind = kind
+        self.attrs = attrs
+        self.spans = []
+        self.round_trips = round_trips
+        self._ts = time.time()
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, **counts):
+        rt0 = self.round_trips() if self.round_trips else None
+        t0 = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            rec = {"name": name, "ms": round((time.perf_counter() - t0) * 1000, 2)}
+            if rt0 is not None:
+                rec["round_trips"] = self.round_trips() - rt0
+            rec.update(counts)
+            self.spans.append(rec)
+
+    def finish(self, **attrs) -> dict:
+        rec = {"ts": round(self._ts, 3), "kind": self.kind,
+               "total_ms": round((time.perf_counter() - self._t0) * 1000, 2)}
+        rec.update(self.attrs)
+        rec.update(attrs)
+        rec["spans"] = self.spans
+        if trace_log.handlers:
+            trace_log.info(json.dumps(rec, ensure_ascii=False, default=str))
+        return rec
+
+    def summary(self) -> str:
+        """'attach 120ms · discover 31ms · ...' with spans of the same name added up."""
+        totals = {}
+        for s in self.spans:
+            totals[s["name"]] = totals.get(s["name"], 0) + s["ms"]
+        return " · ".join(f"{name} {ms:.0f}ms" for name, ms in totals.items())
+
+# =============== Platform: window title + icon ===============
+# Mỗi nền tảng một class cùng giao diện: supports_titles, visible_window_titles(), render_icon().
+# get_window_api() chọn lúc dùng lần đầu, nên pywin32 chỉ được import trên Windows.
+class Win32WindowApi:
+    """The only code that touches pywin32 (imported here, on first use); swap in a fake with the same surface to test."""
+    supports_titles = True
 
-def get_icon_from_exe(exe_path: str, size: int = 20):
-    try:
-        large, small = win32gui.ExtractIconEx(exe_path, 0)
-        hicon = (small[0] if small else (large[0] if large else None))
-        if not hicon:
-            return None
+    def __init__(self):
+        global win32gui, win32process, win32con, win32ui
+        import win32gui, win32process, win32con, win32ui
 
-        hdc_screen = win32ui.CreateDCFromHandle(win32gui.GetDC(0))
-        hbmp = win32ui.CreateBitmap()
-        hbmp.CreateCompatibleBitmap(hdc_screen, size, size)
+    def visible_window_titles(self):
+        """Return [(pid, title)] for visible top-level windows with a title, in one EnumWindows pass."""
+        out = []
 
-        memdc = hdc_screen.CreateCompatibleDC()
-        memdc.SelectObject(hbmp)
-        win32gui.DrawIconEx(memdc.GetHandleOutput(), 0, 0, hicon, size, size, 0, None, win32con.DI_NORMAL)
+        def callback(hwnd, _):
+            try:
+                if win32gui.IsWindowVisible(hwnd):
+                    title = win32gui.GetWindowText(hwnd)
+                    if title.strip():
+                        tid, pid = win32process.GetWindowThreadProcessId(hwnd)
+                        out.append((pid, title))
+            except Exception:
+                pass
 
-        bmpinfo = hbmp.GetInfo()
-        bmpstr = hbmp.GetBitmapBits(True)
+        win32gui.EnumWindows(callback, None)
+        return out
 
-        from PIL import Image  # already imported Pillow; keep local import for clarity
-        img = Image.frombuffer("RGB",
-                               (bmpinfo["bmWidth"], bmpinfo["bmHeight"]),
-                               bmpstr, "raw", "BGRX", 0, 1)
-        return ImageTk.PhotoImage(img)
-    except Exception:
+    def render_icon(self, exe_path: str, size: int):
+        """Render the exe's first icon to a PIL image, releasing every GDI handle it creates."""
+        from PIL import Image
+        large, small = win32gui.ExtractIconEx(exe_path, 0)
+        hdc = hdc_screen = memdc = hbmp = None
+        try:
+            hicon = (small[0] if small else (large[0] if large else None))
+            if not hicon:
+                return None
+
+            hdc = win32gui.GetDC(0)
+            hdc_screen = win32ui.CreateDCFromHandle(hdc)
+            hbmp = win32ui.CreateBitmap()
+            hbmp.CreateCompatibleBitmap(hdc_screen, size, size)
+
+            memdc = hdc_screen.CreateCompatibleDC()
+            memdc.SelectObject(hbmp)
+            win32gui.DrawIconEx(memdc.GetHandleOutput(), 0, 0, hicon, size, size, 0, None, win32con.DI_NORMAL)
+
+            bmpinfo = hbmp.GetInfo()
+            bmpstr = hbmp.GetBitmapBits(True)
+
+            return Image.frombuffer("RGB",
+                                    (bmpinfo["bmWidth"], bmpinfo["bmHeight"]),
+                                    bmpstr, "raw", "BGRX", 0, 1).copy()
+        finally:
+            if memdc is not None:
+                memdc.DeleteDC()
+            if hbmp is not None:
+                win32gui.DeleteObject(hbmp.GetHandle())
+            if hdc is not None:
+                win32gui.ReleaseDC(0, hdc)
+            for h in list(large) + list(small):
+                win32gui.DestroyIcon(h)
+
+class NullWindowApi:
+    """No-op implementation (Linux/macOS, or Windows without pywin32): no titles, no icons.
+
+    supports_titles is False so the scanner keeps browsers instead of dropping untitled ones.
+    """
+    supports_titles = False
+
+    def visible_window_titles(self):
+        return []
+
+    def render_icon(self, exe_path: str, size: int):
         return None
 
+win32gui = win32process = win32con = win32ui = None
+_window_api = None
+
+def get_window_api():
+    """The platform's window API, created on first use."""
+    global _window_api
+    if _window_api is None:
+        api = NullWindowApi()
+        if sys.platform == "win32":
+            try:
+                api = Win32WindowApi()
+            except ImportError:  # thiếu pywin32: vẫn chạy, chỉ không có title/icon
+                pass
+        _window_api = api
+    return _window_api
+
+def window_title_index(api=None) -> dict:
+    """One EnumWindows pass -> {pid: [titles]} (first title = topmost window)."""
+    index = {}
+    for pid, title in (api or get_window_api()).visible_window_titles():
+        index.setdefault(pid, []).append(title)
+    return index
+
+class IconCache:
+    """Bounded LRU of rendered icons keyed by (exe path, mtime, file size, icon size)."""
+    def __init__(self, api=None, maxsize: int = 64):
+        self._api = api
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, exe_path: str, size: int = 20):
+        """Return a PIL image or None (thread-safe; wrap in ImageTk.PhotoImage on the Tk thread)."""
+        if not exe_path:
+            return None
+        try:
+            st = os.stat(exe_path)
+        except OSError:
+            return None
+        key = (os.path.normcase(exe_path), st.st_mtime, st.st_size, size)
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        try:
+            img = (self._api or get_window_api()).render_icon(exe_path, size)
+        except Exception:
+            img = None
+        with self._lock:
+            self._items[key] = img
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return img
+
+icon_cache = IconCache()
+
 # =============== Browser scan (Chromium-based) ===============
 BROWSER_KEYWORDS = ["chrome", "msedge", "brave", "hidemium"]
 
-def find_running_browsers():
-    """Return list of dicts: {pid, name, exe, port, title, icon} for processes that expose remote-debugging-port."""
-    found = []
-    for p in psutil.process_iter(["pid", "name", "exe", "cmdline"]):
+HIDEMIUM_FILE = "hidemium_profiles.json"
+PROBE_TIMEOUT = 0.8
+PROBE_WORKERS = 32
+
+_http_session = None
+
+def http_session():
+    """Shared keep-alive session for DevTools HTTP endpoints (one pool, reused by every probe)."""
+    global _http_session
+    if _http_session is None:
+        import requests
+        s = requests.Session()
+        s.trust_env = False  # 127.0.0.1 không bao giờ đi qua proxy hệ thống
+        adapter = requests.adapters.HTTPAdapter(pool_connections=PROBE_WORKERS, pool_maxsize=PROBE_WORKERS)
+        s.mount("http://", adapter)
+        _http_session = s
+    return _http_session
+
+def probe_endpoints(ports, timeout: float = PROBE_TIMEOUT) -> dict:
+    """Probe /json/version on every port concurrently.
+
+    Returns {port: version_info} for ports that answered; wall time is bounded by the slowest probe.
+    """
+    ports = list(dict.fromkeys(str(p) for p in ports))
+    if not ports:
+        return {}
+
+    def probe(port):
+        try:
+            r = http_session().get(f"http://127.0.0.1:{port}/json/version", timeout=timeout)
+        except Exception:
+            return port, None
+        try:
+            return port, r.json()
+        except ValueError:
+            return port, {}
+
+    with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(ports))) as pool:
+        return {port: info for port, info in pool.map(probe, ports) if info is not None}
+
+def load_declared_ports(path: str = HIDEMIUM_FILE) -> list:
+    """Return [{"tên", "port"}] from hidemium_profiles.json (empty if the file is missing)."""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return []
+    return [d for d in data if isinstance(d, dict) and d.get("port")] if isinstance(data, list) else []
+
+def list_debuggable_processes() -> dict:
+    """Walk the process table; returns {port: {pid, name, exe, created}} for browsers with remote-debugging-port."""
+    import psutil
+    candidates = {}
+    for p in psutil.process_iter(["pid", "name", "exe", "cmdline", "create_time"]):
         try:
             name = (p.info["name"] or "").lower()
             if not any(k in name for k in BROWSER_KEYWORDS):
@@ -126,418 +667,1353 @@ def find_running_browsers():
             m = re.search(r"--remote-debugging-port=(\d+)", cmdline)
             if not m:
                 continue
-            port = m.group(1)
-
-            # Validate the endpoint is active
-            try:
-                requests.get(f"http://127.0.0.1:{port}/json/version", timeout=0.8)
-            except Exception:
-                continue
-
-            # Lấy title
-            title = get_window_title_from_pid(p.info["pid"]) or ""
-            if not title.strip():   # 👈 bỏ qua browser không có title
-                continue
-
-            # Lấy icon
-            icon = get_icon_from_exe(p.info.get("exe") or "")  # may be None
-
-            found.append({
+            candidates.setdefault(m.group(1), {
                 "pid": p.info["pid"],
                 "name": p.info["name"],
                 "exe": p.info.get("exe") or "",
-                "port": port,
-                "title": title,
-                "icon": icon
+                "created": p.info.get("create_time"),
             })
         except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
             continue
         except Exception:
             continue
-    return found
-
-# =============== Dialogs ===============
-class ProfileForm(tk.Toplevel):
-    """Add / Edit profile"""
-    def __init__(self, master, initial=None):
-        super().__init__(master)
-        self.title("Hồ sơ")
-        self.resizable(False, False)
-        self.result = None
-        self.protocol("WM_DELETE_WINDOW", self.on_close)
-
-        frm = ttk.Frame(self, padding=10)
-        frm.pack(fill="both", expand=True)
-
-        self.vars = {}
-        for i, field in enumerate(FIELDS):
-            ttk.Label(frm, text=field).grid(row=i, column=0, sticky="w", padx=4, pady=3)
-            var = tk.StringVar(value=(initial.get(field, "") if initial else ""))
-            ent = ttk.Entry(frm, textvariable=var, width=36, show="*" if "khẩu" in field.upper() or field == "PIN" else "")
-            ent.grid(row=i, column=1, sticky="w", padx=4, pady=3)
-            self.vars[field] = var
-
-        btns = ttk.Frame(frm)
-        btns.grid(row=len(FIELDS), column=0, columnspan=2, pady=(10, 0))
-        ttk.Button(btns, text="Lưu", command=self.on_ok).pack(side="left", padx=5)
-        ttk.Button(btns, text="Huỷ", command=self.on_close).pack(side="left", padx=5)
-
-        self.bind("<Return>", lambda e: self.on_ok())
-        self.grab_set()
-        self.transient(master)
-        self.focus()
-        center_window(self, master)
-        self.protocol("WM_DELETE_WINDOW", self.on_close)
-
-    def on_ok(self):
-        data = {f: self.vars[f].get() for f in FIELDS}
-        self.result = data
-        self.destroy()
-    def on_close(self):
-        self.result = None
-        self.destroy()    
-
-class FieldMapEditor(tk.Toplevel):
-    """Edit settings.json: field -> keywords list"""
-    def __init__(self, master, settings: dict):
-        super().__init__(master)
-        self.title("Cài đặt nhận dạng trường")
-        self.geometry("580x400")
-        self.settings = {k: list(v) for k, v in settings.items()}
-        self.result = None
-        self.current_field = None
-        
-
-        left = ttk.Frame(self, padding=6); left.pack(side="left", fill="y")
-        right = ttk.Frame(self, padding=6); right.pack(side="right", fill="both", expand=True)
-
-        ttk.Label(left, text="Trường").pack(anchor="w")
-        self.list_fields = tk.Listbox(left, height=20, exportselection=False)
-        self.list_fields.pack(fill="y", expand=False)
-        for f in FIELDS:
-            self.list_fields.insert("end", f)
-        self.list_fields.bind("<<ListboxSelect>>", self.on_select_field)
-        self.list_fields.selection_set(0)
-
-        ttk.Label(right, text="Từ khoá (mỗi dòng một từ)").pack(anchor="w")
-        self.txt_keywords = tk.Text(right, height=15, exportselection=False)
-        self.txt_keywords.pack(fill="both", expand=True)
-
-        btns = ttk.Frame(right); btns.pack(fill="x", pady=6)
-        ttk.Button(btns, text="Lưu thay đổi", command=self.save_current).pack(side="left", padx=4)
-
-        self.on_select_field(None)
-        self.grab_set(); self.transient(master)
-        center_window(self, master)
-
-    def on_select_field(self, _):
-        idx = self.list_fields.curselection()
-        if not idx:
-            return
-        field = self.list_fields.get(idx[0])
-
-        self.current_field = field   # 👈 thêm dòng này để nhớ lại trường đang chọn
-
-        self.txt_keywords.delete("1.0", "end")
-        self.txt_keywords.insert("1.0", "\n".join(self.settings.get(field, [])))
-
-    def save_current(self):
-        if not self.current_field:
-            messagebox.showwarning("Chưa chọn trường", "Vui lòng chọn một trường ở danh sách bên trái trước khi lưu.", parent=self)
-            return
-
-        field = self.current_field
-        raw = self.txt_keywords.get("1.0", "end-1c")
-        arr = [x.strip() for x in raw.splitlines() if x.strip()]
-        self.settings[field] = arr
+    return candidates
+
+class BrowserScanner:
+    """Incremental browser scan with a result cache keyed by (pid, process create time, port).
+
+    Only new or changed processes go through the endpoint probe and icon lookup; cached ones
+    just get their window title refreshed. `refresh()` returns (added, removed, changed) diffs.
+    Call `start()` to run it on a background thread; diffs are then queued on `self.events`.
+    Background rescans only write a trace when they change something, so the periodic scan does
+    not push autofill traces out of the rotating trace log.
+    """
+    def __init__(self, declared=load_declared_ports, walk_processes: bool = True, interval: float = 0,
+                 api=None, icons=None):
+        self.declared = declared
+        self.walk_processes = walk_processes
+        self.interval = interval
+        self.api = api
+        self.icons = icons or icon_cache
+        self.events = queue.Queue()
+        self._cache = {}     # key -> entry, chỉ chứa browser đã xác thực
+        self._current = {}   # iid -> entry của lần quét gần nhất
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_trace = None
+
+    @staticmethod
+    def iid(key) -> str:
+        pid, created, port = key
+        return f"{pid}:{created}:{port}"
+
+    def scan(self, log_trace: bool = True) -> list:
+        """[(iid, entry)] for every live browser; the run is kept in `last_trace` (and logged if `log_trace`)."""
+        trace = Tracer("scan")
+        candidates = {}
+        if self.walk_processes:
+            with trace.span("process_walk") as counts:
+                for port, c in list_debuggable_processes().items():
+                    candidates[(c["pid"], c["created"], port)] = c
+                counts["candidates"] = len(candidates)
+        ports = {key[2] for key in candidates}
+        for d in (self.declared() if callable(self.declared) else self.declared) or []:
+            port = str(d["port"])
+            if port not in ports:
+                candidates[(None, None, port)] = {"pid": None, "name": "", "exe": "", "label": d.get("tên") or ""}
+
+        # Bỏ cache của process đã thoát / đổi; cổng khai báo (không có pid) luôn probe lại
+        self._cache = {k: v for k, v in self._cache.items() if k in candidates}
+        stale = [k for k in candidates if k not in self._cache or k[0] is None]
+        with trace.span("probe", ports=len(stale)) as counts:
+            alive = probe_endpoints(k[2] for k in stale)
+            counts["alive"] = len(alive)
+
+        with trace.span("title_icon", icons=0) as counts:
+            api = self.api or get_window_api()
+            titles = window_title_index(api) if any(k[0] is not None for k in candidates) else {}
+
+            found = []
+            for key, c in candidates.items():
+                pid, _, port = key
+                if pid is None:
+                    if port not in alive:
+                        self._cache.pop(key, None)
+                        continue
+                    name = (alive[port].get("Browser") or "browser").split("/")[0]
+                    entry = {"pid": None, "name": name, "exe": "", "port": port,
+                             "title": c["label"] or f"port {port}", "icon": None}
+                else:
+                    if key not in self._cache and port not in alive:
+                        continue
+                    # Lấy title
+                    title = (titles.get(pid) or [""])[0]
+                    if not title.strip():
+                        if api.supports_titles:   # 👈 bỏ qua browser không có title
+                            continue
+                        title = f"{c['name']} (port {port})"
+                    entry = self._cache.get(key)
+                    if entry is None:
+                        counts["icons"] += 1
+                        entry = {"pid": pid, "name": c["name"], "exe": c["exe"], "port": port,
+                                 "icon": self.icons.get(c["exe"])}  # may be None
+                    entry = dict(entry, title=title)
+                self._cache[key] = entry
+                found.append((self.iid(key), entry))
+        self.last_trace = trace
+        if log_trace:
+            trace.finish(found=len(found))
+        return found
+
+    def refresh(self, log_trace: bool = True):
+        """Rescan and diff against the previous result; the trace is logged if `log_trace` or anything changed."""
+        new = dict(self.scan(log_trace=False))
+        old = self._current
+        self._current = new
+        added = [(iid, e) for iid, e in new.items() if iid not in old]
+        removed = [iid for iid in old if iid not in new]
+        changed = [(iid, e) for iid, e in new.items() if iid in old and old[iid]["title"] != e["title"]]
+        if log_trace or added or removed or changed:
+            self.last_trace.finish(found=len(new), added=len(added), removed=len(removed), changed=len(changed))
+        return added, removed, changed
+
+    # ---- background thread ----
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="browser-scan", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def request_scan(self):
+        self._wake.set()
+
+    def _run(self):
+        requested = True  # lần quét đầu và lần bấm "Quét Browser" luôn ghi trace; quét định kỳ thì không
+        while not self._stop.is_set():
+            try:
+                self.events.put(self.refresh(log_trace=requested))
+            except Exception as e:
+                print("⚠️ Quét browser lỗi:", e)
+            requested = self._wake.wait(self.interval or None)
+            self._wake.clear()
+
+def find_running_browsers(declared=None, walk_processes: bool = True):
+    """Return list of dicts: {pid, name, exe, port, title, icon} for processes that expose remote-debugging-port.
+
+    `declared` is a list like load_declared_ports(); those ports are probed directly, so with
+    walk_processes=False no process table walk happens at all. `icon` is a PIL image or None.
+    """
+    scanner = BrowserScanner(declared=declared or [], walk_processes=walk_processes)
+    return [entry for _, entry in scanner.scan()]
+
+# =============== DOM snapshot + matching ===============
+# Một lần chạy script trả về thuộc tính của mọi input/textarea, thay vì 2 lần
+# get_attribute cho mỗi ô (mỗi lần là 1 HTTP round trip). Script đi qua cả các
+# iframe cùng origin và shadow root mở, theo thứ tự tài liệu, nên vẫn chỉ 1 round
+# trip cho cả trang. Mỗi ô có một "path" làm handle: danh sách [selector, n] -
+# phần tử thứ n khớp selector trong root hiện tại; mọi bước trừ bước cuối là
+# host để đi tiếp vào shadowRoot / contentDocument. Path chỉ là JSON nên bước
+# điền tìm lại được ô mà không cần switch_to.frame, qua cả Selenium lẫn CDP.
+RESOLVE_PATH_JS = r"""
+function resolvePath(path) {
+    var root = document, el = null;
+    for (var i = 0; i < path.length; i++) {
+        if (!root) return null;
+        el = root.querySelectorAll(path[i][0])[path[i][1]] || null;
+        if (!el) return null;
+        if (i < path.length - 1) {
+            try { root = el.shadowRoot || el.contentDocument || null; } catch (e) { root = null; }
+        }
+    }
+    return el;
+}
+"""
+
+SNAPSHOT_JS = r"""
+function cssStep(el, root) {
+    var tag = el.tagName.toLowerCase(), sel;
+    if (el.id) {
+        sel = "#" + CSS.escape(el.id);
+    } else if (el.getAttribute("name")) {
+        sel = tag + '[name="' + CSS.escape(el.getAttribute("name")) + '"]';
+    } else {
+        var parts = [], node = el;
+        while (node && node.nodeType === 1) {
+            var idx = 1, sib = node;
+            while ((sib = sib.previousElementSibling)) {
+                if (sib.tagName === node.tagName) idx++;
+            }
+            parts.unshift(node.tagName.toLowerCase() + ":nth-of-type(" + idx + ")");
+            node = node.parentNode;  // dừng ở document / ShadowRoot
+        }
+        sel = parts.join(" > ");
+    }
+    var matches = root.querySelectorAll(sel);
+    return [sel, Math.max(0, Array.prototype.indexOf.call(matches, el))];
+}
 
-        save_json(SETTINGS_FILE, self.settings)
-        self.result = self.settings
+function describe(el, path) {
+    var label = "";
+    if (el.labels && el.labels.length) {
+        label = el.labels[0].innerText || el.labels[0].textContent || "";
+    } else if (el.getAttribute("aria-label")) {
+        label = el.getAttribute("aria-label");
+    }
+    var rect = el.getBoundingClientRect();
+    var style = el.ownerDocument.defaultView.getComputedStyle(el);
+    return {
+        handle: path,
+        placeholder: el.getAttribute("placeholder") || "",
+        ng_model: el.getAttribute("ng-model") || "",
+        name: el.getAttribute("name") || "",
+        id: el.id || "",
+        type: (el.getAttribute("type") || (el.tagName === "TEXTAREA" ? "textarea" : "text")).toLowerCase(),
+        label: label.trim(),
+        visible: (rect.width > 0 || rect.height > 0)
+                 && style.visibility !== "hidden" && style.display !== "none"
+    };
+}
 
-        messagebox.showinfo("Đã lưu", f"Đã cập nhật từ khoá cho '{field}'.", parent=self)
-    
-    def on_close(self):
-        # KHÔNG gọi save_current nữa
-        self.result = None
-        self.destroy()
+// Chữ ký form: FNV-1a trên thuộc tính + path của mọi ô (không gồm giá trị, visible)
+function formSignature(inputs) {
+    var h = 0x811c9dc5;
+    for (var i = 0; i < inputs.length; i++) {
+        var d = inputs[i];
+        var s = [d.type, d.name, d.id, d.placeholder, d.ng_model, d.label, JSON.stringify(d.handle)].join("\u0001") + "\u0002";
+        for (var j = 0; j < s.length; j++) {
+            h ^= s.charCodeAt(j);
+            h = Math.imul(h, 0x01000193) >>> 0;
+        }
+    }
+    return ("0000000" + h.toString(16)).slice(-8) + ":" + inputs.length;
+}
 
-# =============== Main App ===============
-class App(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title("Autofill By Sum")
-        self.geometry("775x615")
-
-        # Data
-        self.profiles = ensure_file_json(PROFILES_FILE, [])
-        self.field_map = ensure_file_json(SETTINGS_FILE, DEFAULT_FIELD_KEYWORDS)
-        self.browser_list = []
-
-        # ---- Menu ----
-        menubar = tk.Menu(self)
-        m_profile = tk.Menu(menubar, tearoff=0)
-        m_profile.add_command(label="Thêm hồ sơ", command=self.add_profile)
-        m_profile.add_command(label="Sửa hồ sơ", command=self.edit_profile)
-        m_profile.add_command(label="Xoá hồ sơ", command=self.delete_profile)
-        m_profile.add_separator()
-        m_profile.add_command(label="Import JSON...", command=self.import_profiles)
-        m_profile.add_command(label="Export JSON...", command=self.export_profiles)
-        menubar.add_cascade(label="Hồ sơ", menu=m_profile)
-
-        m_setting = tk.Menu(menubar, tearoff=0)
-        m_setting.add_command(label="Nhận dạng trường", command=self.open_field_map_editor)
-        menubar.add_cascade(label="Cài đặt", menu=m_setting)
-        self.config(menu=menubar)
-
-        # ---- Layout ----
-        self.columnconfigure(1, weight=1)
-        self.rowconfigure(1, weight=1)
-
-        # Left: Browser list (with icons)
-        frm_left = ttk.Frame(self, padding=8)
-        frm_left.grid(row=0, column=0, rowspan=2, sticky="nsw")
-        ttk.Label(frm_left, text="Browser đang chạy:", font=("Segoe UI", 10, "bold")).pack(anchor="w")
-
-        self.browser_tree = ttk.Treeview(frm_left, show="tree", height=20)
-        self.browser_tree.pack(fill="both", expand=False, pady=(4, 6), padx=(0, 4))
-
-        ttk.Button(frm_left, text="🔍 Quét Browser", command=self.scan_browsers).pack(fill="x", pady=(0, 6))
-        ttk.Button(frm_left, text="⚡ Autofill hồ sơ đã chọn", command=self.autofill).pack(fill="x")
-
-        # Right top: Profiles table
-        frm_right_top = ttk.Frame(self, padding=(8, 8, 8, 4))
-        frm_right_top.grid(row=0, column=1, sticky="nsew")
-        frm_right_top.columnconfigure(0, weight=1)
-        ttk.Label(frm_right_top, text="Hồ sơ", font=("Segoe UI", 10, "bold")).grid(row=0, column=0, sticky="w")
-
-        self.tbl = ttk.Treeview(frm_right_top,
-                                columns=("Họ tên", "Tài khoản", "SĐT"),
-                                show="headings", height=10)
-        for c in ("Họ tên", "Tài khoản", "SĐT"):
-            self.tbl.heading(c, text=c)
-            self.tbl.column(c, width=180 if c == "Họ tên" else 160, anchor="center")
-        self.tbl.grid(row=1, column=0, sticky="nsew", pady=(4, 6))
-        self.tbl.bind("<<TreeviewSelect>>", lambda e: self.show_profile_detail())
-
-        btns = ttk.Frame(frm_right_top)
-        btns.grid(row=2, column=0, sticky="w", pady=(0, 6))
-        ttk.Button(btns, text="Thêm", command=self.add_profile).pack(side="left", padx=3)
-        ttk.Button(btns, text="Sửa", command=self.edit_profile).pack(side="left", padx=3)
-        ttk.Button(btns, text="Xoá", command=self.delete_profile).pack(side="left", padx=3)
-
-        # Right bottom: profile detail (key/value)
-        frm_right_bottom = ttk.Frame(self, padding=(8, 0, 8, 8))
-        frm_right_bottom.grid(row=1, column=1, sticky="nsew")
-        frm_right_bottom.columnconfigure(0, weight=1)
-        ttk.Label(frm_right_bottom, text="Chi tiết hồ sơ", font=("Segoe UI", 10, "bold")).grid(row=0, column=0, sticky="w")
-
-        self.detail = ttk.Treeview(frm_right_bottom, columns=("field", "value"), show="headings", height=10)
-        self.detail.heading("field", text="Trường")
-        self.detail.heading("value", text="Giá trị")
-        self.detail.column("field", width=200, anchor="w")
-        self.detail.column("value", width=500, anchor="w")
-        self.detail.grid(row=1, column=0, sticky="nsew", pady=(4, 0))
-
-        self.refresh_profile_table()
-
-        # Auto first scan (non-blocking)
-        self.after(300, self.scan_browsers)
-
-    # ---------- Profiles CRUD ----------
-    def refresh_profile_table(self):
-        self.tbl.delete(*self.tbl.get_children())
-        for p in self.profiles:
-            self.tbl.insert("", "end", values=(p.get("Họ tên", ""),
-                                               p.get("Tài khoản", ""),
-                                               p.get("SĐT", "")))
-        self.show_profile_detail()
-
-    def current_profile_index(self):
-        sel = self.tbl.selection()
-        if not sel:
-            return None
-        return self.tbl.index(sel[0])
+var out = [];
+(function walk(root, prefix) {
+    var all = root.querySelectorAll("*");
+    for (var i = 0; i < all.length; i++) {
+        var el = all[i], tag = el.tagName;
+        if (tag === "INPUT" || tag === "TEXTAREA") {
+            out.push(describe(el, prefix.concat([cssStep(el, root)])));
+        } else if (tag === "IFRAME" || tag === "FRAME") {
+            var doc = null;
+            try { doc = el.contentDocument; } catch (e) {}  // khác origin: bỏ qua
+            if (doc) walk(doc, prefix.concat([cssStep(el, root)]));
+        }
+        if (el.shadowRoot) walk(el.shadowRoot, prefix.concat([cssStep(el, root)]));
+    }
+})(document, []);
+// arguments[0]: các khoá "origin|signature" đã có trong cache -> khớp thì khỏi gửi danh sách ô
+var form = { origin: location.origin, signature: formSignature(out), hit: false, inputs: out };
+if ((arguments[0] || []).indexOf(form.origin + "|" + form.signature) >= 0) {
+    form.hit = true;
+    form.inputs = [];
+}
+return form;
+"""
+
+SNAPSHOT_KEYS = ("placeholder", "ng_model", "name", "id", "type", "label")
+
+# Chờ form sẵn sàng bằng MutationObserver thay vì poll: resolve khi mọi trường cần
+# điền đã có ô khớp từ khoá; nếu mới khớp một phần thì chờ DOM yên `settle` ms;
+# form đã render sẵn thì trả về ngay. Theo dõi cả shadow root mở + iframe cùng
+# origin. Script trả về Promise: CDP awaitPromise, Selenium execute_script đều chờ.
+WAIT_READY_JS = r"""
+var wanted = arguments[0], timeoutMs = arguments[1], settleMs = arguments[2], keys = arguments[3], t0 = Date.now();
+
+// Cùng các thuộc tính mà bước chấm điểm dùng (khoá như SNAPSHOT_KEYS: ng_model -> ng-model, label)
+function attrText(el, key) {
+    if (key === "label") {
+        if (el.labels && el.labels.length) return el.labels[0].innerText || el.labels[0].textContent || "";
+        return el.getAttribute("aria-label") || "";
+    }
+    if (key === "id") return el.id || "";
+    if (key === "type") return el.getAttribute("type") || (el.tagName === "TEXTAREA" ? "textarea" : "text");
+    return el.getAttribute(key.replace("_", "-")) || "";
+}
+var watched = [];
+for (var a = 0; a < keys.length; a++) watched.push(keys[a] === "label" ? "aria-label" : keys[a].replace("_", "-"));
+
+function scan() {
+    var roots = [], hay = [], stack = [document];
+    while (stack.length) {
+        var root = stack.pop(), all = root.querySelectorAll("*");
+        roots.push(root);
+        for (var i = 0; i < all.length; i++) {
+            var el = all[i], tag = el.tagName;
+            if (tag === "INPUT" || tag === "TEXTAREA") {
+                var parts = [];
+                for (var a = 0; a < keys.length; a++) parts.push(attrText(el, keys[a]));
+                hay.push(parts.join("\0").toLowerCase());
+            } else if (tag === "IFRAME" || tag === "FRAME") {
+                var doc = null;
+                try { doc = el.contentDocument; } catch (e) {}
+                if (doc) stack.push(doc);
+            }
+            if (el.shadowRoot) stack.push(el.shadowRoot);
+        }
+    }
+    var matched = 0;
+    for (var w = 0; w < wanted.length; w++) {
+        var kws = wanted[w][1], hit = false;
+        for (var h = 0; h < hay.length && !hit; h++) {
+            for (var k = 0; k < kws.length; k++) {
+                if (hay[h].indexOf(kws[k]) >= 0) { hit = true; break; }
+            }
+        }
+        if (hit) matched++;
+    }
+    return { roots: roots, matched: matched };
+}
 
-    def show_profile_detail(self):
-        self.detail.delete(*self.detail.get_children())
-        idx = self.current_profile_index()
-        if idx is None or idx >= len(self.profiles):
-            return
-        p = self.profiles[idx]
-        for f in FIELDS:
-            self.detail.insert("", "end", values=(f, p.get(f, "")))
-
-    def add_profile(self):
-        dlg = ProfileForm(self)
-        self.wait_window(dlg)
-        if dlg.result:
-            self.profiles.append(dlg.result)
-            save_json(PROFILES_FILE, self.profiles)
-            self.refresh_profile_table()
-
-    def edit_profile(self):
-        idx = self.current_profile_index()
-        if idx is None:
-            messagebox.showinfo("Chọn hồ sơ", "Hãy chọn 1 hồ sơ để sửa.", parent=self)
-            return
-        dlg = ProfileForm(self, initial=self.profiles[idx])
-        self.wait_window(dlg)
-        if dlg.result:
-            self.profiles[idx] = dlg.result
-            save_json(PROFILES_FILE, self.profiles)
-            self.refresh_profile_table()
-
-    def delete_profile(self):
-        idx = self.current_profile_index()
-        if idx is None:
-            return
-        if messagebox.askyesno("Xác nhận", "Xoá hồ sơ đã chọn?", parent=self):
-            del self.profiles[idx]
-            save_json(PROFILES_FILE, self.profiles)
-            self.refresh_profile_table()
-
-    def import_profiles(self):
-        path = filedialog.askopenfilename(filetypes=[("JSON", "*.json")])
-        if not path: return
-        try:
+return new Promise(function (resolve) {
+    var observed = [], checks = 0, done = false, pending = null, settleTimer = null, timeoutTimer = null;
+    var observer = new MutationObserver(function () {
+        if (!pending) pending = setTimeout(check, 16);  // gộp các đợt mutation liên tiếp
+    });
+
+    function finish(ready, matched, timedOut) {
+        if (done) return;
+        done = true;
+        observer.disconnect();
+        clearTimeout(pending); clearTimeout(settleTimer); clearTimeout(timeoutTimer);
+        resolve({ ready: ready, timed_out: timedOut, matched: matched, wanted: wanted.length,
+                  checks: checks, waited_ms: Date.now() - t0 });
+    }
+
+    function check() {
+        pending = null;
+        if (done) return;
+        checks++;
+        var s = scan();
+        for (var i = 0; i < s.roots.length; i++) {
+            if (observed.indexOf(s.roots[i]) < 0) {
+                observed.push(s.roots[i]);
+                // characterData: chữ trong <label> đổi cũng có thể làm ô khớp
+                observer.observe(s.roots[i], { childList: true, subtree: true, attributes: true,
+                                               attributeFilter: watched, characterData: true });
+            }
+        }
+        if (s.matched >= wanted.length || (s.matched && checks === 1)) {
+            finish(true, s.matched, false);
+        } else if (s.matched) {
+            clearTimeout(settleTimer);
+            settleTimer = setTimeout(function () { finish(true, s.matched, false); }, settleMs);
+        }
+    }
+
+    timeoutTimer = setTimeout(function () {
+        var matched = scan().matched;
+        finish(matched > 0, matched, true);
+    }, timeoutMs);
+    check();
+});
+"""
+
+def snapshot_form(page, known=()) -> dict:
+    """Snapshot the page in one round trip: {origin, signature, hit, inputs}.
+
+    `inputs` are dicts {handle, placeholder, ng_model, name, id, type, label, visible}; `handle`
+    is the element's path (see RESOLVE_PATH_JS), valid across frames and shadow roots.
+    If "origin|signature" is in `known` (SelectorCache.keys()), hit is True and inputs is empty.
+    """
+    form = page.run(SNAPSHOT_JS, list(known)) or {}
+    inputs = []
+    for attrs in (form.get("inputs") or []):
+        info = {k: str(attrs.get(k) or "") for k in SNAPSHOT_KEYS}
+        info["visible"] = bool(attrs.get("visible"))
+        info["handle"] = attrs.get("handle")
+        inputs.append(info)
+    return {"origin": str(form.get("origin") or ""), "signature": str(form.get("signature") or ""),
+            "hit": bool(form.get("hit")), "inputs": inputs}
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over every field_map keyword, lower-cased once at build time.
+
+    `fields_in(text)` walks `text` a single time and returns all fields with a keyword in it;
+    `keyword_hits(text)` returns every (keyword id, start) occurrence, for scoring.
+    """
+    def __init__(self, field_map: dict):
+        self.fields = list(field_map)
+        self.keywords = {f: [kw.lower() for kw in kws if kw] for f, kws in field_map.items()}
+        # Đổi field_map hoặc cách chấm điểm thì selector đã lưu (SelectorCache) không còn đúng
+        self.fingerprint = hashlib.sha1(json.dumps([field_map, SCORE_ATTR_WEIGHTS], sort_keys=True, ensure_ascii=False)
+                                        .encode("utf-8")).hexdigest()[:12]
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [set()]
+        self._out_kw = [()]
+        self.keyword_list = []   # keyword id -> keyword
+        kw_ids = {}
+        pairs = []               # (keyword id, field index)
+        for fi, (field, keywords) in enumerate(field_map.items()):
+            for kw in keywords:
+                kw = (kw or "").lower()
+                if not kw:
+                    continue
+                node = 0
+                for ch in kw:
+                    nxt = self._goto[node].get(ch)
+                    if nxt is None:
+                        nxt = len(self._goto)
+                        self._goto[node][ch] = nxt
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._out.append(set())
+                        self._out_kw.append(())
+                    node = nxt
+                self._out[node].add(field)
+                if kw not in kw_ids:
+                    kw_ids[kw] = len(self.keyword_list)
+                    self.keyword_list.append(kw)
+                    self._out_kw[node] = (kw_ids[kw],)
+                pairs.append((kw_ids[kw], fi))
+
+        # BFS để dựng fail links; con trực tiếp của root có fail = 0
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+                self._out_kw[nxt] += self._out_kw[self._fail[nxt]]
+
+        self._pairs = sorted(set(pairs))
+        self._pair_table = None
+
+    def pair_table(self):
+        """Sparse keyword -> field weights as numpy arrays (start offsets per keyword, field, weight).
+
+        Longer keywords are more specific; a keyword shared by several fields splits its weight.
+        Built on first use so constructing a matcher does not import numpy.
+        """
+        if self._pair_table is None:
+            import numpy as np
+            pairs = self._pairs
+            kw = np.array([k for k, _ in pairs], dtype=np.intp)
+            field = np.array([f for _, f in pairs], dtype=np.intp)
+            shared = np.bincount(kw, minlength=len(self.keyword_list))
+            lengths = np.array([len(self.keyword_list[k]) for k in kw], dtype=float)
+            weight = (0.5 + np.minimum(lengths, 16) / 16) / (shared[kw] if pairs else 1)
+            start = np.searchsorted(kw, np.arange(len(self.keyword_list) + 1))
+            self._pair_table = (start, field, weight)
+        return self._pair_table
+
+    def keyword_hits(self, text: str) -> list:
+        """[(keyword id, start index)] for every keyword occurrence in lower-cased `text`."""
+        goto, fail, out_kw, kws = self._goto, self._fail, self._out_kw, self.keyword_list
+        hits = []
+        node = 0
+        for pos, ch in enumerate(text.lower()):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for kid in out_kw[node]:
+                hits.append((kid, pos - len(kws[kid]) + 1))
+        return hits
+
+    def fields_in(self, text: str) -> set:
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        node = 0
+        for ch in text.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found |= out[node]
+        return found
+
+# Cộng vào timeout của lệnh chờ form: transport (websocket/WebDriver) không được hết giờ trước JS
+WAIT_READY_MARGIN = 5
+
+def wait_for_form(page, matcher: KeywordMatcher, profile: dict, timeout: float, settle: float = 0.15) -> dict:
+    """Block (in the page, one round trip) until inputs for the profile's fields are rendered.
+
+    Inputs count when a keyword appears in any attribute scored by score_matrix (SCORE_ATTR_WEIGHTS).
+    Returns {ready, timed_out, matched, wanted, checks, waited_ms}; ready is also True when only
+    some fields appeared and the DOM then stayed quiet for `settle` seconds.
+    """
+    wanted = [[f, matcher.keywords[f]] for f in matcher.fields
+              if matcher.keywords.get(f) and (profile.get(f) or "").strip()]
+    if not wanted:
+        return {"ready": True, "timed_out": False, "matched": 0, "wanted": 0, "checks": 0, "waited_ms": 0}
+    res = page.run(WAIT_READY_JS, wanted, int(timeout * 1000), int(settle * 1000), list(SCORE_ATTR_WEIGHTS),
+                   timeout=timeout + WAIT_READY_MARGIN)
+    return res if isinstance(res, dict) else {}
+
+# Trọng số theo thuộc tính; chất lượng khớp: trùng cả chuỗi > trùng cả từ > chuỗi con
+SCORE_ATTR_WEIGHTS = {"placeholder": 1.0, "ng_model": 1.0, "label": 1.0, "name": 0.8, "id": 0.6, "type": 0.6}
+SCORE_EXACT, SCORE_TOKEN, SCORE_SUBSTRING = 1.0, 0.8, 0.5
+SCORE_HIDDEN_FACTOR = 0.6  # ô ẩn (thường là honeypot) bị ưu tiên thấp hơn
+
+def score_matrix(matcher: KeywordMatcher, inputs: list) -> "numpy.ndarray":
+    """fields x inputs score matrix (rows in matcher.fields order).
+
+    Each keyword occurrence in an input attribute scores attr weight * match quality, spread
+    over the keyword's fields with the keyword's weight; 0 means no keyword of the field hit.
+    """
+    rows, kids, vals = [], [], []
+    for i, info in enumerate(inputs):
+        for attr, weight in SCORE_ATTR_WEIGHTS.items():
+            text = info.get(attr) or ""
+            if not text:
+                continue
+            best = {}
+            for kid, start in matcher.keyword_hits(text):
+                end = start + len(matcher.keyword_list[kid])
+                if start == 0 and end == len(text):
+                    q = SCORE_EXACT
+                elif (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    q = SCORE_TOKEN
+                else:
+                    q = SCORE_SUBSTRING
+                best[kid] = max(best.get(kid, 0), q)
+            for kid, q in best.items():
+                rows.append(i)
+                kids.append(kid)
+                vals.append(weight * q)
+
+    import numpy as np
+    scores = np.zeros((len(matcher.fields), len(inputs)))
+    if not rows:
+        return scores
+    rows, kids, vals = np.array(rows), np.array(kids), np.array(vals)
+    # Nhân với ma trận thưa keyword -> field: lặp mỗi hit theo số field của keyword
+    pair_start, pair_field, pair_weight = matcher.pair_table()
+    counts = pair_start[kids + 1] - pair_start[kids]
+    pair_idx = np.repeat(pair_start[kids] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    np.add.at(scores, (pair_field[pair_idx], np.repeat(rows, counts)),
+              np.repeat(vals, counts) * pair_weight[pair_idx])
+    hidden = np.array([not info.get("visible", True) for info in inputs])
+    scores[:, hidden] *= SCORE_HIDDEN_FACTOR
+    return scores
+
+def linear_assignment(cost: "numpy.ndarray") -> "numpy.ndarray":
+    """Min-cost one-to-one assignment (Hungarian / shortest augmenting path, O(n^2 m)).
+
+    Returns, for each row, the assigned column (every row gets one when rows <= cols; with
+    more rows than cols the extra rows get -1).
+    """
+    import numpy as np
+    n, m = cost.shape
+    if n > m:
+        cols = linear_assignment(cost.T)
+        rows = np.full(n, -1)
+        rows[cols] = np.arange(m)
+        return rows
+    c = np.zeros((n + 1, m + 1))
+    c[1:, 1:] = cost
+    u, v = np.zeros(n + 1), np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.intp)    # p[j]: hàng (1-based) đang giữ cột j, 0 = trống
+    way = np.zeros(m + 1, dtype=np.intp)
+    for i in range(1, n + 1):
+        p[0], j0 = i, 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            free = ~used
+            cur = c[p[j0]] - u[p[j0]] - v
+            better = free & (cur < minv)
+            minv[better] = cur[better]
+            way[better] = j0
+            masked = np.where(free, minv, np.inf)
+            j1 = int(np.argmin(masked))
+            delta = masked[j1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    assign = np.full(n, -1)
+    assign[p[1:][p[1:] > 0] - 1] = np.nonzero(p[1:])[0]
+    return assign
+
+def match_fields(matcher: KeywordMatcher, profile: dict, inputs: list):
+    """Assign each profile field to at most one input and vice versa, maximizing total score.
+
+    Returns (picks, not_found); picks is a list of (field, value, input_info) in field_map order,
+    input_info being a copy with "score" and "confidence" (0..1, how clearly this pair beat the
+    best competing input for the field / field for the input).
+    """
+    wanted = [(fi, field, (profile.get(field) or "").strip()) for fi, field in enumerate(matcher.fields)]
+    wanted = [w for w in wanted if w[2]]
+    if not wanted or not inputs:
+        return [], [field for _, field, _ in wanted]
+    import numpy as np
+
+    scores = score_matrix(matcher, inputs)[[fi for fi, _, _ in wanted]]
+    # Chỉ giải trên các hàng/cột có điểm > 0 (form hàng trăm ô thường chỉ vài chục ô khớp)
+    live_rows = np.nonzero(scores.max(axis=1) > 0)[0]
+    live_cols = np.nonzero(scores.max(axis=0) > 0)[0]
+    assigned = {}
+    if len(live_rows):
+        sub = scores[np.ix_(live_rows, live_cols)]
+        for r, c in enumerate(linear_assignment(-sub)):
+            if c >= 0 and sub[r, c] > 0:
+                assigned[live_rows[r]] = live_cols[c]
+
+    picks, not_found = [], []
+    for row, (_, field, val) in enumerate(wanted):
+        col = assigned.get(row)
+        if col is None:
+            not_found.append(field)
+            continue
+        s = scores[row, col]
+        rival = max(np.delete(scores[row], col).max(initial=0), np.delete(scores[:, col], row).max(initial=0))
+        info = dict(inputs[col], score=round(float(s), 3), confidence=round(float(s / (s + rival)), 2))
+        picks.append((field, val, info))
+    return picks, not_found
+
+class SelectorCache:
+    """Persistent LRU of what worked per form: "origin|signature" -> {matcher, fields, missing}.
+
+    `fields` maps each filled field to its input info (incl. handle); `missing` lists fields
+    the form has no input for. Saved to `path` as JSON on every change (path=None: memory only).
+    """
+    def __init__(self, path: str = SELECTOR_CACHE_FILE, maxsize: int = 200):
+        self.path = path
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
             data = ensure_file_json(path, [])
-            if isinstance(data, list):
-                self.profiles.extend(data)
-                save_json(PROFILES_FILE, self.profiles)
-                self.refresh_profile_table()
-                messagebox.showinfo("OK", "Đã import hồ sơ.", parent=self)
-            else:
-                messagebox.showerror("Lỗi", "File không hợp lệ (phải là mảng JSON).", parent=self)
-        except Exception as e:
-            messagebox.showerror("Lỗi", str(e))
-
-    def export_profiles(self):
-        path = filedialog.asksaveasfilename(defaultextension=".json",
-                                            filetypes=[("JSON", "*.json")])
-        if not path: return
-        try:
-            save_json(path, self.profiles)
-            messagebox.showinfo("OK", "Đã export hồ sơ.", parent=self)
-        except Exception as e:
-            messagebox.showerror("Lỗi", str(e))
-
-    # ---------- Settings editor ----------
-    def open_field_map_editor(self):
-        dlg = FieldMapEditor(self, self.field_map)
-        self.wait_window(dlg)
-        if dlg.result:
-            self.field_map = dlg.result
-
-    # ---------- Browsers ----------
-    def scan_browsers(self):
-        # clear old
-        for iid in self.browser_tree.get_children():
-            self.browser_tree.delete(iid)
-        self.browser_list = find_running_browsers()
-        if not self.browser_list:
-            self.browser_tree.insert("", "end", text="(Không tìm thấy browser nào có --remote-debugging-port)")
-            return
-        # show with icon + title
-        for i, b in enumerate(self.browser_list):
-            label = f"{b['name']} | {b['title'] or '(no title)'} (port {b['port']})"
-            self.browser_tree.insert("", "end", iid=str(i), text=label, image=b.get("icon"))
-
-    def selected_browser(self):
-        sel = self.browser_tree.selection()
-        if not sel:
+            for item in data if isinstance(data, list) else []:
+                if isinstance(item, list) and len(item) == 2 and isinstance(item[1], dict):
+                    self._items[item[0]] = item[1]
+
+    @staticmethod
+    def key(origin: str, signature: str) -> str:
+        return f"{origin}|{signature}"
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._items)
+
+    def get(self, origin: str, signature: str):
+        with self._lock:
+            entry = self._items.get(self.key(origin, signature))
+            if entry is not None:
+                self._items.move_to_end(self.key(origin, signature))
+            return entry
+
+    def put(self, origin: str, signature: str, matcher: KeywordMatcher, fields: dict, missing):
+        """Record a full-discovery result, merged with what earlier profiles found on the same form."""
+        key = self.key(origin, signature)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is None or old.get("matcher") != matcher.fingerprint:
+                old = {"fields": {}, "missing": []}
+            merged = dict(old["fields"])
+            merged.update(fields)
+            missing = (set(old["missing"]) | set(missing)) - set(merged)
+            self._items[key] = {"matcher": matcher.fingerprint, "fields": merged, "missing": sorted(missing)}
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+            self._save()
+
+    def invalidate(self, origin: str, signature: str):
+        with self._lock:
+            if self._items.pop(self.key(origin, signature), None) is not None:
+                self._save()
+
+    def picks(self, origin: str, signature: str, matcher: KeywordMatcher, profile: dict):
+        """(picks, not_found) from the cached entry, or None if it can't answer for this profile."""
+        entry = self.get(origin, signature)
+        if entry is None or entry.get("matcher") != matcher.fingerprint:
             return None
-        idx = int(sel[0])
-        if 0 <= idx < len(self.browser_list):
-            return self.browser_list[idx]
-        return None
-
-               # ---------- Autofill ----------
-    def autofill(self):
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.support.ui import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
-        from selenium.webdriver.common.keys import Keys
-
-        b = self.selected_browser()
-        if not b:
-            show_error("Lỗi", "Hãy chọn một browser ở khung bên trái.", parent=self)
-            return
-
-        pidx = self.current_profile_index()
-        if pidx is None:
-            show_error("Lỗi", "Hãy chọn một hồ sơ để autofill.", parent=self)
-            return
-        profile = self.profiles[pidx]
+        picks, not_found = [], []
+        for field in matcher.fields:
+            val = (profile.get(field) or "").strip()
+            if not val:
+                continue
+            if field in entry["fields"]:
+                picks.append((field, val, entry["fields"][field]))
+            elif field in entry["missing"]:
+                not_found.append(field)
+            else:
+                return None  # hồ sơ có trường mà lần trước chưa dò
+        return picks, not_found
+
+    def _save(self):
+        if self.path:
+            save_json(self.path, [[k, v] for k, v in self._items.items()])
+
+# =============== Fill engine ===============
+class AutofillCancelled(Exception):
+    pass
+
+def check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise AutofillCancelled()
+
+# Điền mọi ô đã khớp trong 1 lần chạy script. Dùng native setter để cả
+# AngularJS (ng-model) lẫn React nhận giá trị, rồi bắn input/change/blur.
+BATCH_FILL_JS = RESOLVE_PATH_JS + r"""
+var items = arguments[0], report = [];
+for (var i = 0; i < items.length; i++) {
+    var el = resolvePath(items[i][0]), val = items[i][1];
+    if (!el) {
+        report.push({ ok: false, error: "stale element" });
+        continue;
+    }
+    try {
+        var win = el.ownerDocument.defaultView;  // prototype của đúng frame chứa ô
+        var proto = el.tagName === "TEXTAREA" ? win.HTMLTextAreaElement.prototype : win.HTMLInputElement.prototype;
+        var setter = Object.getOwnPropertyDescriptor(proto, "value").set;
+        el.focus();
+        setter.call(el, val);
+        el.dispatchEvent(new Event("input", { bubbles: true }));
+        el.dispatchEvent(new Event("change", { bubbles: true }));
+        el.dispatchEvent(new Event("blur"));
+        report.push({ ok: el.value === val, error: el.value === val ? "" : "value rejected" });
+    } catch (e) {
+        report.push({ ok: false, error: String(e) });
+    }
+}
+return report;
+"""
+
+# Gõ phím thật: focus + xoá giá trị cũ, gõ vào ô đang focus (kể cả trong iframe),
+# rồi bắn change/blur
+TYPE_BEGIN_JS = RESOLVE_PATH_JS + r"""
+var el = resolvePath(arguments[0]);
+if (!el) return false;
+el.focus();
+if (el.select) el.select();
+var win = el.ownerDocument.defaultView;
+var proto = el.tagName === "TEXTAREA" ? win.HTMLTextAreaElement.prototype : win.HTMLInputElement.prototype;
+Object.getOwnPropertyDescriptor(proto, "value").set.call(el, "");
+el.dispatchEvent(new Event("input", { bubbles: true }));
+return true;
+"""
+
+TYPE_END_JS = RESOLVE_PATH_JS + r"""
+var el = resolvePath(arguments[0]);
+if (!el) return false;
+el.dispatchEvent(new Event("change", { bubbles: true }));
+el.dispatchEvent(new Event("blur"));
+return el.value === arguments[1];
+"""
+
+def fill_inputs(page, picks: list, typed_fields=(), cancel=None, trace=None) -> list:
+    """Fill picks [(field, value, input_info)]; returns [{field, ok, mode, error}] in picks order.
+
+    Fields in `typed_fields` are typed with real keystrokes (page.type_text); everything else
+    (and any typing failure) is set with one BATCH_FILL_JS call.
+    """
+    trace = trace or Tracer("fill")
+    typed_fields = set(typed_fields)
+    report = {}
+    batch = []
+    for field, val, info in picks:
+        if field in typed_fields:
+            check_cancel(cancel)
+            with trace.span("type", field=field) as counts:
+                try:
+                    counts["ok"] = bool(page.type_text(info["handle"], val))
+                except Exception:
+                    counts["ok"] = False
+            if counts["ok"]:
+                report[field] = {"field": field, "ok": True, "mode": "typed", "error": ""}
+                continue
+            # fallback JS
+        batch.append((field, val, info))
 
+    if batch:
+        check_cancel(cancel)
+        with trace.span("fill_batch", fields=len(batch)) as counts:
+            try:
+                results = page.run(BATCH_FILL_JS, [[info["handle"], val] for _, val, info in batch])
+            except Exception as e:
+                results = [{"ok": False, "error": str(e)}] * len(batch)
+            # Trang trả về thiếu/sai kết quả (None, mảng ngắn hơn): ô không có kết quả coi như lỗi
+            results = [res if isinstance(res, dict) else {"ok": False, "error": "no result"}
+                       for res in (results if isinstance(results, list) else [])[:len(batch)]]
+            results += [{"ok": False, "error": "no result"}] * (len(batch) - len(results))
+            counts["ok"] = sum(1 for res in results if res.get("ok"))
+        for (field, _, _), res in zip(batch, results):
+            report[field] = {"field": field, "ok": bool(res.get("ok")), "mode": "batch", "error": res.get("error") or ""}
+
+    return [report[field] for field, _, _ in picks]
+
+# =============== Autofill pipeline + sessions ===============
+def profile_label(profile: dict) -> str:
+    return profile.get("Tài khoản") or profile.get("Họ tên") or "(không tên)"
+
+def autofill_page(page, profile: dict, matcher: KeywordMatcher, typed_fields=(), log=print,
+                  progress=None, cancel=None, trace=None, cache=None, ready_timeout: float = 0) -> dict:
+    """Snapshot -> match -> fill on the session's current page (any engine with run/type_text).
+
+    `progress(event, data)` receives "inputs" {count}, "field" {field, status, detail} and
+    "done" {result}; setting the `cancel` Event stops the run between steps (AutofillCancelled).
+    Phases are recorded as spans on `trace` (a Tracer) when given.
+    With a SelectorCache, a form seen before (same origin + signature) skips matching and is
+    filled with the stored handles; a stale handle drops the entry and reruns full discovery.
+    `ready_timeout` > 0 first waits (wait_for_form) for the form to render, emitting "waiting".
+    Returns {"filled": [...], "not_found": [...], "report": [...], "inputs": n, "cached": bool}.
+    """
+    emit = progress or (lambda event, data: None)
+    trace = trace or Tracer("autofill")
+
+    if ready_timeout > 0:
+        check_cancel(cancel)
+        emit("waiting", {"timeout": ready_timeout})
+        with trace.span("ready") as counts:
+            ready = wait_for_form(page, matcher, profile, ready_timeout)
+            counts.update({k: ready.get(k) for k in ("matched", "wanted", "checks", "waited_ms")})
+        if ready.get("timed_out"):
+            log(f"⚠️ Sau {ready_timeout:g}s form mới có ô cho {ready.get('matched', 0)}/{ready.get('wanted', 0)} trường")
+
+    # 1 round trip: chụp toàn bộ input/textarea + thuộc tính (hoặc chỉ chữ ký nếu đã có cache)
+    check_cancel(cancel)
+    with trace.span("discover") as counts:
+        form = snapshot_form(page, cache.keys() if cache else ())
+        counts["inputs"] = len(form["inputs"])
+    cached = cache.picks(form["origin"], form["signature"], matcher, profile) if form["hit"] else None
+    if form["hit"] and cached is None:
+        with trace.span("discover") as counts:
+            form = snapshot_form(page)
+            counts["inputs"] = len(form["inputs"])
+    inputs = form["inputs"]
+
+    if cached is not None:
+        picks, not_found = cached
+        emit("inputs", {"count": len(picks)})
+        log(f"⚡ Dùng selector đã lưu cho form {form['origin']} ({form['signature']})")
+    else:
+        emit("inputs", {"count": len(inputs)})
+        log("=== DEBUG: Các input tìm thấy ===")
+        for info in inputs:
+            log("placeholder:", info["placeholder"], "| ng-model:", info["ng_model"],
+                "| name:", info["name"], "| id:", info["id"], "| type:", info["type"],
+                "| label:", info["label"], "| visible:", info["visible"])
+        log("================================")
+
+        # Chấm điểm mọi cặp trường x ô (placeholder, ng-model, name, id, label, type) rồi ghép 1-1
+        with trace.span("match", inputs=len(inputs)) as counts:
+            picks, not_found = match_fields(matcher, profile, inputs)
+            counts["matched"] = len(picks)
+    for field in not_found:
+        log(f"⚠️ Không tìm thấy ô cho '{field}'")
+        emit("field", {"field": field, "status": "not_found", "detail": ""})
+    for field, _, info in picks:
+        emit("field", {"field": field, "status": "filling",
+                       "detail": f"{info['placeholder'] or info['name']} ({info.get('confidence', 1):.0%})"})
+
+    report = fill_inputs(page, picks, typed_fields, cancel, trace)
+    if cached is not None and any(res["error"] == "stale element" for res in report):
+        log("⚠️ Selector đã lưu không còn khớp, dò lại form")
+        cache.invalidate(form["origin"], form["signature"])
+        return autofill_page(page, profile, matcher, typed_fields, log, progress, cancel, trace, cache)  # không chờ form lần nữa
+    if cache is not None and cached is None and form["origin"]:
+        ok = {field for (field, _, _), res in zip(picks, report) if res["ok"]}
+        cache.put(form["origin"], form["signature"], matcher,
+                  {field: {k: v for k, v in info.items() if k != "visible"} for field, _, info in picks if field in ok},
+                  not_found)
+
+    filled = []
+    for res, (field, _, info) in zip(report, picks):
+        if res["ok"]:
+            filled.append(field)
+            log(f"✅ Điền '{field}' ({res['mode']}, tin cậy {info.get('confidence', 1):.0%}) vào placeholder: "
+                f"'{info['placeholder']}' | ng-model: '{info['ng_model']}'")
+            emit("field", {"field": field, "status": "filled", "detail": res["mode"]})
+        else:
+            not_found.append(field)
+            log(f"⚠️ Không điền được '{field}': {res['error']}")
+            emit("field", {"field": field, "status": "failed", "detail": res["error"]})
+
+    log("=== Kết quả autofill ===")
+    log("Đã điền:", filled if filled else "Không có")
+    if not_found:
+        log("Chưa tìm thấy:", not_found)
+    result = {"filled": filled, "not_found": not_found, "report": report, "inputs": len(inputs),
+              "cached": cached is not None}
+    emit("done", {"result": result})
+    return result
+
+class PageSession:
+    """Shared autofill flow for engines; subclasses provide attach/run/type_text/close and `attached`.
+
+    `round_trips` counts every WebDriver/CDP call made through the session.
+    """
+    engine = ""
+
+    def __init__(self, port, host: str = "127.0.0.1"):
+        self.port = str(port)
+        self.host = host
+        self.round_trips = 0
+        self.lock = threading.Lock()  # một trang chỉ nên bị điền bởi 1 luồng tại một thời điểm
+
+    def autofill(self, profile: dict, matcher: KeywordMatcher, typed_fields=(), **hooks) -> dict:
+        """hooks: log / progress / cancel / trace, see autofill_page."""
+        trace = hooks.pop("trace", None) or Tracer("autofill", round_trips=lambda: self.round_trips)
+        trace.attrs.update(engine=self.engine, port=self.port, profile=profile_label(profile))
+        progress = hooks.get("progress")
+        result = None
         try:
+            with trace.span("attach", reused=self.attached):
+                self.attach()
+            if progress:
+                progress("attached", {"port": self.port})
+            result = autofill_page(self, profile, matcher, typed_fields, trace=trace, **hooks)
+            return result
+        finally:
+            trace.finish(filled=len(result["filled"]) if result else 0, ok=result is not None)
+            if progress:
+                progress("trace", {"summary": trace.summary()})
+
+class SeleniumSession(PageSession):
+    """Selenium attached to an already running browser through its debugger_address."""
+    engine = "selenium"
+
+    def __init__(self, port, host: str = "127.0.0.1"):
+        super().__init__(port, host)
+        self.driver = None
+        self.script_timeout = 30  # mặc định của WebDriver cho script async/Promise
+
+    @property
+    def attached(self) -> bool:
+        return self.driver is not None
+
+    def attach(self):
+        if self.driver is None:
+            from selenium import webdriver
+            from selenium.webdriver.chrome.options import Options
             options = Options()
-            options.debugger_address = f"127.0.0.1:{b['port']}"
-            driver = webdriver.Chrome(options=options)
-        except Exception as e:
-            show_error("Không thể kết nối", f"Không attach được Selenium: {e}", parent=self)
-            return
-
-        filled, not_found = [], []
-
-        # Lấy tất cả input/textarea
-        all_inputs = driver.find_elements("xpath", "//input | //textarea")
-        print("=== DEBUG: Các input tìm thấy ===")
-        for el in all_inputs:
+            options.debugger_address = f"{self.host}:{self.port}"
+            self.driver = webdriver.Chrome(options=options)
+        return self.driver
+
+    def run(self, script: str, *args, timeout: float = None):
+        """execute_script; `timeout` (seconds) raises the driver's script timeout when a call needs longer."""
+        driver = self.attach()
+        if timeout and timeout > self.script_timeout:
+            self.round_trips += 1
+            driver.set_script_timeout(timeout)
+            self.script_timeout = timeout
+        self.round_trips += 1
+        return driver.execute_script(script, *args)
+
+    def type_text(self, handle, val) -> bool:
+        from selenium.webdriver.common.action_chains import ActionChains
+        if not self.run(TYPE_BEGIN_JS, handle):
+            return False
+        # Phím đi tới ô đang focus, không cần switch_to.frame theo path
+        self.round_trips += 1
+        ActionChains(self.attach()).send_keys(val).perform()
+        return bool(self.run(TYPE_END_JS, handle, val))
+
+    def close(self):
+        # Chỉ dừng chromedriver; quit() có thể đóng luôn browser của người dùng
+        if self.driver is not None:
             try:
-                print("placeholder:", el.get_attribute("placeholder"),
-                    "| ng-model:", el.get_attribute("ng-model"))
-            except:
+                self.driver.service.stop()
+            except Exception:
                 pass
-        print("================================")
-
-        # Autofill theo settings (placeholder + ng-model)
-        for field, keywords in self.field_map.items():
-            val = (profile.get(field) or "").strip()
-            if not val:
-                continue
+            self.driver = None
+            self.script_timeout = 30
+
+class CdpError(Exception):
+    pass
+
+class CdpConnection:
+    """Minimal DevTools protocol client over one target's websocket (no chromedriver)."""
+    def __init__(self, ws_url: str, timeout: float = 10):
+        import websocket  # websocket-client
+        # Chrome 111+ từ chối handshake có header Origin lạ
+        self.ws = websocket.create_connection(ws_url, timeout=timeout, suppress_origin=True)
+        self._next_id = 0
+
+    def call(self, method: str, recv_timeout: float = None, **params) -> dict:
+        """Send one command and wait for its reply; `recv_timeout` overrides the socket timeout for this call."""
+        self._next_id += 1
+        msg_id = self._next_id
+        self.ws.send(json.dumps({"id": msg_id, "method": method, "params": params}))
+        default = self.ws.gettimeout()
+        if recv_timeout is not None:
+            self.ws.settimeout(max(recv_timeout, default or 0))
+        try:
+            while True:
+                msg = json.loads(self.ws.recv())
+                if msg.get("id") != msg_id:
+                    continue  # event hoặc phản hồi cũ
+                if "error" in msg:
+                    raise CdpError(msg["error"].get("message") or str(msg["error"]))
+                return msg.get("result") or {}
+        finally:
+            if recv_timeout is not None:
+                self.ws.settimeout(default)
+
+    def close(self):
+        try:
+            self.ws.close()
+        except Exception:
+            pass
 
-            success = False
-            for el in all_inputs:
+def list_page_targets(port, host: str = "127.0.0.1", timeout: float = 2, url_pattern: str = "") -> list:
+    """GET /json/list -> page targets only (tabs), most recently focused first.
+
+    `url_pattern` is a case-insensitive regex searched in each tab's URL ("" keeps every tab).
+    """
+    r = http_session().get(f"http://{host}:{port}/json/list", timeout=timeout)
+    match = re.compile(url_pattern, re.IGNORECASE).search if url_pattern else None
+    return [t for t in r.json() if t.get("type") == "page" and t.get("webSocketDebuggerUrl")
+            and (match is None or match(t.get("url") or ""))]
+
+class CdpSession(PageSession):
+    """Autofill engine that talks to the tab's DevTools websocket directly: Runtime.evaluate for
+    snapshot/fill and Input.insertText for typing. Same run/type_text surface as SeleniumSession."""
+    engine = "cdp"
+
+    def __init__(self, port, host: str = "127.0.0.1", target: dict = None):
+        super().__init__(port, host)
+        self.target = target
+        self.conn = None
+
+    @property
+    def attached(self) -> bool:
+        return self.conn is not None
+
+    def attach(self):
+        if self.conn is None:
+            target = self.target
+            if target is None:
+                pages = list_page_targets(self.port, self.host)
+                if not pages:
+                    raise CdpError(f"Không có tab nào trên port {self.port}")
+                target = pages[0]
+            self.conn = CdpConnection(target["webSocketDebuggerUrl"])
+        return self.conn
+
+    def run(self, script: str, *args, timeout: float = None):
+        """Runtime.evaluate; `timeout` (seconds) extends the websocket wait for long-running scripts."""
+        expr = f"(function(){{{script}\n}}).apply(null, {json.dumps(list(args), ensure_ascii=False)})"
+        conn = self.attach()
+        self.round_trips += 1
+        res = conn.call("Runtime.evaluate", recv_timeout=timeout, expression=expr,
+                        returnByValue=True, awaitPromise=True)
+        if res.get("exceptionDetails"):
+            details = res["exceptionDetails"]
+            raise CdpError((details.get("exception") or {}).get("description") or details.get("text") or "JS error")
+        return (res.get("result") or {}).get("value")
+
+    def type_text(self, handle, val) -> bool:
+        if not self.run(TYPE_BEGIN_JS, handle):
+            return False
+        self.round_trips += 1
+        self.attach().call("Input.insertText", text=val)
+        return bool(self.run(TYPE_END_JS, handle, val))
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+ENGINES = {"selenium": SeleniumSession, "cdp": CdpSession}
+
+class SessionPool:
+    """One reusable attached session per port, shared between autofill clicks and batch workers."""
+    def __init__(self, factory=SeleniumSession):
+        self.factory = factory
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, port):
+        port = str(port)
+        with self._lock:
+            s = self._sessions.get(port)
+            if s is None:
+                s = self._sessions[port] = self.factory(port)
+            return s
+
+    def drop(self, port):
+        with self._lock:
+            s = self._sessions.pop(str(port), None)
+        if s is not None:
+            s.close()
+
+    def close_all(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for s in sessions:
+            s.close()
+
+    def autofill(self, port, profile: dict, matcher: KeywordMatcher, typed_fields=(), **hooks) -> dict:
+        """Autofill through the pooled session; a stale session (browser restarted) is re-attached once."""
+        for attempt in (1, 2):
+            s = self.get(port)
+            with s.lock:
+                reused = s.attached
                 try:
-                    placeholder = (el.get_attribute("placeholder") or "").lower()
-                    ng_model   = (el.get_attribute("ng-model") or "").lower()
-
-                    if any(k.lower() in placeholder or k.lower() in ng_model for k in keywords):
-                        try:
-                            el.clear()
-                        except:
-                            pass
-
-                        try:
-                            # Xoá sạch rồi nhập mới
-                            el.send_keys(Keys.CONTROL + "a")
-                            el.send_keys(Keys.DELETE)
-                            el.send_keys(val)
-                        except:
-                            # fallback JS
-                            driver.execute_script(
-                                "arguments[0].value = arguments[1]; "
-                                "arguments[0].dispatchEvent(new Event('input', { bubbles: true }));",
-                                el, val
-                            )
-                        filled.append(field)
-                        print(f"✅ Điền '{field}' vào placeholder: '{placeholder}' | ng-model: '{ng_model}'")
-                        success = True
-                        break
+                    return s.autofill(profile, matcher, typed_fields, **hooks)
+                except AutofillCancelled:
+                    raise
                 except Exception:
-                    continue
+                    if not reused or attempt == 2:
+                        raise
+            self.drop(port)
 
-            if not success:
-                not_found.append(field)
-                print(f"⚠️ Không tìm thấy ô cho '{field}'")
+def run_in_background(fn, *args) -> Future:
+    """Run fn(*args) on a daemon thread; the Tk side polls the returned Future with after()."""
+    fut = Future()
+
+    def target():
+        if fut.set_running_or_notify_cancel():
+            try:
+                fut.set_result(fn(*args))
+            except BaseException as e:
+                fut.set_exception(e)
 
-        print("=== Kết quả autofill ===")
-        print("Đã điền:", filled if filled else "Không có")
-        if not_found:
-            print("Chưa tìm thấy:", not_found)
+    threading.Thread(target=target, daemon=True).start()
+    return fut
+
+def pair_assignments(ports, profiles) -> list:
+    """Auto-pair browsers with profiles in order: [(port, profile), ...] up to the shorter list."""
+    return list(zip((str(p) for p in ports), profiles))
+
+def fill_row(row: dict, fill) -> dict:
+    """Run fill() -> autofill result and record filled/not_found (or the error) and seconds in `row`."""
+    row.update(filled=[], not_found=[], error="")
+    t0 = time.perf_counter()
+    try:
+        res = fill()
+        row["filled"], row["not_found"] = res["filled"], res["not_found"]
+    except Exception as e:
+        row["error"] = str(e)
+    row["seconds"] = round(time.perf_counter() - t0, 3)
+    return row
+
+def run_batch(assignments, matcher: KeywordMatcher, typed_fields=(), pool=None,
+              max_workers: int = 4, log=print, **hooks) -> list:
+    """Fill every (port, profile) assignment on a bounded worker pool; `hooks` (cache,
+    ready_timeout) are passed to every autofill.
+
+    Returns one summary row per assignment, in input order:
+    {port, profile, filled, not_found, error, seconds}.
+    """
+    pool = pool or SessionPool()
+
+    def job(item):
+        port, profile = item
+        return fill_row({"port": str(port), "profile": profile_label(profile)},
+                        lambda: pool.autofill(port, profile, matcher, typed_fields,
+                                              log=lambda *a: log(f"[{port}]", *a), **hooks))
+
+    assignments = list(assignments)
+    if not assignments:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(assignments)))) as ex:
+        return list(ex.map(job, assignments))
+
+def pair_tabs(targets, profiles) -> list:
+    """[(target, profile), ...]: one profile dict goes to every tab, a list is paired with the tabs in order."""
+    if isinstance(profiles, dict):
+        return [(t, profiles) for t in targets]
+    return list(zip(targets, profiles))
+
+def run_tabs(port, profiles, matcher: KeywordMatcher, typed_fields=(), url_pattern: str = "",
+             max_workers: int = 4, log=print, host: str = "127.0.0.1", **hooks) -> list:
+    """Fill every tab of the browser on `port` whose URL matches `url_pattern`, concurrently.
+
+    Each tab gets its own CdpSession bound to that target (a selenium session only drives
+    the current tab). `profiles` is one profile for all tabs or a list paired in tab order.
+    Returns one row per tab: {port, tab, url, profile, filled, not_found, error, seconds};
+    no matching tab -> [].
+    """
+    assignments = pair_tabs(list_page_targets(port, host, url_pattern=url_pattern), profiles)
+
+    def job(item):
+        target, profile = item
+        session = CdpSession(port, host, target=target)
+        tag = f"[{port}/{target.get('id', '')[:8]}]"
+        try:
+            return fill_row({"port": str(port), "tab": target.get("id", ""), "url": target.get("url", ""),
+                             "profile": profile_label(profile)},
+                            lambda: session.autofill(profile, matcher, typed_fields,
+                                                     log=lambda *a: log(tag, *a), **hooks))
+        finally:
+            session.close()
+
+    if not assignments:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(assignments)))) as ex:
+        return list(ex.map(job, assignments))
+
+# =============== CLI (không dùng Tk) ===============
+def parse_profile_pairs(pairs) -> dict:
+    """["Tài khoản=abc", "SĐT=09..."] -> {"Tài khoản": "abc", "SĐT": "09..."}."""
+    profile = {}
+    for pair in pairs or []:
+        key, sep, value = pair.partition("=")
+        if not sep or not key.strip():
+            raise ValueError(f"--profile cần dạng KEY=VALUE, nhận được: {pair!r}")
+        profile[key.strip()] = value.strip()
+    return profile
+
+def resolve_profile(store: ProfileStore, profile=None, profile_id=None) -> dict:
+    """Profile for a CLI/plan entry: by store id, or the stored profile whose account/phone/email
+    agree with every one of those given in `profile` (its values override), or `profile` itself."""
+    if profile_id is not None:
+        found = store.get(int(profile_id))
+        if found is None:
+            raise ValueError(f"Không có hồ sơ id={profile_id}")
+        return dict(found, **(profile or {}))
+    if not profile:
+        raise ValueError("Thiếu hồ sơ (--profile KEY=VALUE hoặc --profile-id)")
+    dup = store.find_duplicate(profile)
+    if dup and all(str(dup[1].get(f) or "").strip() == str(profile[f]).strip()
+                   for f in PROFILE_DEDUPE_FIELDS if str(profile.get(f) or "").strip()):
+        return dict(dup[1], **profile)
+    return dict(profile)
+
+def cli_context(args) -> dict:
+    options = load_options()
+    if options.get("trace"):
+        enable_tracing()
+    engine = args.engine or options.get("engine")
+    hooks = {"ready_timeout": float(options.get("ready_timeout") or 0) if args.ready_timeout is None else args.ready_timeout}
+    if options.get("selector_cache") and not args.no_cache:
+        hooks["cache"] = SelectorCache(maxsize=int(options.get("selector_cache_size") or 200))
+    log = (lambda *a: None) if args.quiet else (lambda *a: print(*a, file=sys.stderr))
+    return {"matcher": KeywordMatcher(ensure_file_json(SETTINGS_FILE, DEFAULT_FIELD_KEYWORDS)),
+            "typed_fields": args.typed.split(",") if args.typed else list(options["typed_fields"]),
+            "pool": SessionPool(ENGINES.get(engine, SeleniumSession)),
+            "workers": getattr(args, "workers", None) or int(options.get("batch_workers") or 4),
+            "tab_url_pattern": options.get("tab_url_pattern") or "",
+            "hooks": hooks, "log": log}
+
+def emit_json(obj):
+    print(json.dumps(obj, ensure_ascii=False, default=str), flush=True)
+
+def cli_scan(args) -> int:
+    browsers = find_running_browsers(declared=load_declared_ports(), walk_processes=not args.no_walk)
+    emit_json([{k: v for k, v in b.items() if k != "icon"} for b in browsers])
+    return 0
+
+def cli_fill(args) -> int:
+    ctx = cli_context(args)
+    store = ProfileStore()
+    pairs, ids = parse_profile_pairs(args.profile), args.profile_id or [None]
+    if len(ids) > 1 and args.tabs is None:
+        raise ValueError("Nhiều --profile-id chỉ dùng được với --tabs")
+    try:
+        profiles = [resolve_profile(store, pairs, pid) for pid in ids]
+    finally:
+        store.close()
+    if args.tabs is not None:
+        pattern = ctx["tab_url_pattern"] if args.tabs is True else args.tabs
+        rows = run_tabs(args.port, profiles[0] if len(profiles) == 1 else profiles, ctx["matcher"],
+                        ctx["typed_fields"], pattern, ctx["workers"], ctx["log"], **ctx["hooks"])
+        if not rows:
+            raise ValueError(f"Không có tab nào khớp {pattern!r} trên port {args.port}")
+        for row in rows:
+            emit_json(row)
+        return 1 if any(row["error"] for row in rows) else 0
+    try:
+        rows = run_batch([(args.port, profiles[0])], ctx["matcher"], ctx["typed_fields"], ctx["pool"], 1, ctx["log"], **ctx["hooks"])
+    finally:
+        ctx["pool"].close_all()
+    emit_json(rows[0])
+    return 1 if rows[0]["error"] else 0
+
+def iter_plan(path: str):
+    """Plan lines (JSONL, "-" = stdin): {"port": 9222, "profile": {...}} and/or "profile_id"."""
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8-sig")
+    try:
+        for n, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"Plan dòng {n}: {e}") from None
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def cli_batch(args) -> int:
+    ctx = cli_context(args)
+    store = ProfileStore()
+    try:
+        assignments = [(str(item["port"]), resolve_profile(store, item.get("profile"), item.get("profile_id")))
+                       for item in iter_plan(args.plan)]
+    finally:
+        store.close()
+    try:
+        rows = run_batch(assignments, ctx["matcher"], ctx["typed_fields"], ctx["pool"], ctx["workers"], ctx["log"], **ctx["hooks"])
+    finally:
+        ctx["pool"].close_all()
+    for row in rows:
+        emit_json(row)
+    return 1 if any(row["error"] for row in rows) else 0
+
+def cli_main(argv=None) -> int:
+    """python main.py scan | fill --port P --profile KEY=VALUE... | batch --plan plan.jsonl
+
+    Results go to stdout as JSON (batch: one row per line), logs to stderr. Exit code 1 if any fill errored.
+    """
+    ap = argparse.ArgumentParser(prog="main.py", description="Autofill không cần giao diện; kết quả in ra dạng JSON.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p_scan = sub.add_parser("scan", help="liệt kê browser đang mở remote-debugging-port")
+    p_scan.add_argument("--no-walk", action="store_true", help="chỉ probe các port khai báo trong hidemium_profiles.json")
+    p_scan.set_defaults(run=cli_scan)
+
+    p_fill = sub.add_parser("fill", help="điền 1 hồ sơ vào browser trên 1 port")
+    p_fill.add_argument("--port", required=True)
+    p_fill.add_argument("--profile", action="append", metavar="KEY=VALUE",
+                        help="lặp lại được; khớp hồ sơ đã lưu theo Tài khoản/SĐT/Email, nếu không có thì dùng thẳng")
+    p_fill.add_argument("--profile-id", type=int, action="append",
+                        help="id hồ sơ trong profiles.db; với --tabs lặp lại được (mỗi tab một hồ sơ, theo thứ tự tab)")
+    p_fill.add_argument("--tabs", nargs="?", const=True, metavar="URL_REGEX",
+                        help='điền song song mọi tab có URL khớp regex (bỏ trống = tab_url_pattern, "" = mọi tab), luôn dùng engine cdp')
+    p_fill.add_argument("--workers", type=int, help="số tab điền song song với --tabs (mặc định batch_workers)")
+    p_fill.set_defaults(run=cli_fill)
+
+    p_batch = sub.add_parser("batch", help="điền song song theo plan JSONL")
+    p_batch.add_argument("--plan", required=True, help='file JSONL, mỗi dòng {"port": 9222, "profile": {...}} hoặc "profile_id"; "-" = stdin')
+    p_batch.add_argument("--workers", type=int, help="số browser điền song song (mặc định batch_workers)")
+    p_batch.set_defaults(run=cli_batch)
+
+    for p in (p_fill, p_batch):
+        p.add_argument("--engine", choices=list(ENGINES), help="mặc định theo options.json")
+        p.add_argument("--typed", help="các trường gõ phím thật, cách nhau bởi dấu phẩy")
+        p.add_argument("--ready-timeout", type=float, help="giây chờ form render (0 = quét ngay)")
+        p.add_argument("--no-cache", action="store_true", help="không dùng selector_cache.json")
+        p.add_argument("--quiet", action="store_true", help="không in log ra stderr")
+
+    args = ap.parse_args(argv)
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+    try:
+        return args.run(args)
+    except (ValueError, KeyError, OSError, re.error) as e:
+        emit_json({"error": str(e)})
+        return 2
 
 # =============== Run ===============
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(cli_main(sys.argv[1:]))
+    # Giao diện Tk nằm ở gui.py, chỉ import khi mở cửa sổ: CLI chạy được trên máy không có Tk.
+    # gui.py import lại "main" -> trỏ về chính module đang chạy thay vì nạp main.py lần nữa.
+    sys.modules.setdefault("main", sys.modules[__name__])
+    from gui import App
     # Nếu build bằng PyInstaller, dùng --noconsole để ẩn CMD.
     # Ví dụ: pyinstaller -F -w main.py
     app = App()
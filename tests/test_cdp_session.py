@@ -0,0 +1,120 @@
+"""CdpSession / CdpConnection against a local stand-in DevTools websocket server.
+
+The stand-in speaks the real protocol framing (JSON messages with ids over a websocket),
+interleaves unrelated events before every reply, and answers the autofill scripts from a
+fixed form. Run with: python -m pytest -q
+"""
+import json, threading, time
+
+import pytest
+
+websockets_sync = pytest.importorskip("websockets.sync.server")
+
+import main
+
+FORM = [
+    {"handle": [["#u", 0]], "placeholder": "Tên đăng nhập", "ng_model": "user.login", "name": "username",
+     "id": "u", "type": "text", "label": "", "visible": True},
+    {"handle": [['input[name="email"]', 0]], "placeholder": "", "ng_model": "", "name": "email",
+     "id": "", "type": "email", "label": "", "visible": True},
+    {"handle": [["#note", 0]], "placeholder": "Ghi chú", "ng_model": "", "name": "note",
+     "id": "note", "type": "text", "label": "", "visible": True},
+]
+
+class StandInDevTools:
+    """One page target served by websockets; records filled values and typed text."""
+    def __init__(self):
+        self.values = {}
+        self.typed = []
+        self.server = websockets_sync.serve(self.handler, "127.0.0.1", 0)
+        self.port = self.server.socket.getsockname()[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def target(self) -> dict:
+        return {"id": "T0", "type": "page", "url": "http://standin.test/signup",
+                "webSocketDebuggerUrl": f"ws://127.0.0.1:{self.port}/devtools/page/T0"}
+
+    def handler(self, ws):
+        for raw in ws:
+            msg = json.loads(raw)
+            ws.send(json.dumps({"method": "Runtime.consoleAPICalled", "params": {"type": "log"}}))
+            if msg["method"] == "Runtime.evaluate":
+                reply = {"id": msg["id"], "result": self.evaluate(msg["params"]["expression"])}
+            elif msg["method"] == "Input.insertText":
+                self.typed.append(msg["params"]["text"])
+                reply = {"id": msg["id"], "result": {}}
+            else:
+                reply = {"id": msg["id"], "error": {"code": -32601, "message": f"'{msg['method']}' wasn't found"}}
+            ws.send(json.dumps(reply))
+
+    def evaluate(self, expr: str) -> dict:
+        body, _, args = expr.rpartition("\n}).apply(null, ")
+        script, args = body[len("(function(){"):], json.loads(args[:-1])
+        if script == main.SNAPSHOT_JS:
+            value = {"origin": "http://standin.test", "signature": "0badf00d:3", "hit": False, "inputs": FORM}
+        elif script == main.WAIT_READY_JS:
+            time.sleep(args[1] / 1000)  # không ô nào khớp: JS chờ đủ timeoutMs
+            value = {"ready": False, "timed_out": True, "matched": 0, "wanted": len(args[0]),
+                     "checks": 1, "waited_ms": args[1]}
+        elif script == main.BATCH_FILL_JS:
+            for handle, val in args[0]:
+                self.values[handle[0][0]] = val
+            value = [{"ok": True, "error": ""} for _ in args[0]]
+        else:
+            return {"result": {}, "exceptionDetails": {"text": "Uncaught",
+                                                       "exception": {"description": "ReferenceError: boom"}}}
+        return {"result": {"type": "object", "value": value}}
+
+    def close(self):
+        self.server.shutdown()
+
+@pytest.fixture
+def devtools():
+    server = StandInDevTools()
+    yield server
+    server.close()
+
+@pytest.fixture
+def matcher():
+    return main.KeywordMatcher(main.DEFAULT_FIELD_KEYWORDS)
+
+def test_autofill_end_to_end(devtools, matcher):
+    session = main.CdpSession(devtools.port, target=devtools.target)
+    try:
+        res = session.autofill({"Tài khoản": "abc", "Email": "a@b.c", "Chi nhánh": "HN"}, matcher, log=lambda *a: None)
+    finally:
+        session.close()
+    assert sorted(res["filled"]) == ["Email", "Tài khoản"]
+    assert res["not_found"] == ["Chi nhánh"]
+    assert devtools.values == {"#u": "abc", 'input[name="email"]': "a@b.c"}
+    assert session.round_trips == 2  # snapshot + một lần điền hàng loạt
+
+def test_call_skips_events_and_raises_protocol_errors(devtools):
+    conn = main.CdpConnection(devtools.target["webSocketDebuggerUrl"], timeout=2)
+    try:
+        with pytest.raises(main.CdpError, match="wasn't found"):
+            conn.call("Nope.method")
+        assert conn.call("Input.insertText", text="xyz") == {}
+        assert devtools.typed == ["xyz"]
+    finally:
+        conn.close()
+
+def test_script_exception_raises_cdp_error(devtools):
+    session = main.CdpSession(devtools.port, target=devtools.target)
+    try:
+        with pytest.raises(main.CdpError, match="ReferenceError: boom"):
+            session.run("throw new ReferenceError('boom')")
+    finally:
+        session.close()
+
+def test_ready_wait_outlives_socket_timeout(devtools, matcher):
+    # Socket timeout ngắn hơn ready_timeout: lệnh chờ form vẫn phải đợi JS tự hết giờ
+    session = main.CdpSession(devtools.port, target=devtools.target)
+    session.conn = main.CdpConnection(devtools.target["webSocketDebuggerUrl"], timeout=0.3)
+    try:
+        res = session.autofill({"Tài khoản": "abc"}, matcher, log=lambda *a: None, ready_timeout=0.6)
+        assert res["filled"] == ["Tài khoản"]
+        assert session.conn.ws.gettimeout() == 0.3  # timeout riêng chỉ áp cho lệnh chờ
+    finally:
+        session.close()
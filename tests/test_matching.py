@@ -0,0 +1,57 @@
+"""KeywordMatcher and linear_assignment against naive reference implementations."""
+import itertools, random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import main
+
+def brute_force_cost(cost) -> float:
+    n, m = cost.shape
+    if n <= m:
+        return min(sum(cost[i, c] for i, c in enumerate(cols)) for cols in itertools.permutations(range(m), n))
+    return min(sum(cost[r, j] for j, r in enumerate(rows)) for rows in itertools.permutations(range(n), m))
+
+@pytest.mark.parametrize("seed", range(300))
+def test_linear_assignment_matches_brute_force(seed):
+    rng = random.Random(seed)
+    n, m = rng.randint(1, 5), rng.randint(1, 5)
+    cost = np.array([[rng.choice([0, 0.5, 1, rng.random() * 3]) for _ in range(m)] for _ in range(n)])
+    assign = main.linear_assignment(cost)
+
+    assert len(assign) == n
+    used = [int(c) for c in assign if c >= 0]
+    assert len(used) == len(set(used)) == min(n, m)  # một-một, đủ min(n, m) cặp
+    total = sum(cost[i, c] for i, c in enumerate(assign) if c >= 0)
+    assert total == pytest.approx(brute_force_cost(cost))
+
+FIELD_MAP = {
+    "Tài khoản": ["tài khoản", "username", "user", "login"],
+    "Mật khẩu": ["mật khẩu", "password", "pass"],
+    "Nhập lại mật khẩu": ["nhập lại mật khẩu", "confirm_password", "confirm"],
+    "Email": ["email", "mail", "e-mail"],
+    "SĐT": ["sđt", "số điện thoại", "phone", "mobile"],
+}
+
+TEXTS = ["", "Username", "user.confirm_password", "Nhập lại Mật Khẩu", "E-MAIL của bạn", "xyz",
+         "mobilephone", "usernameusername", "passpassword", "Số Điện Thoại / phone"]
+
+def naive_hits(matcher, text: str) -> list:
+    text = text.lower()
+    return sorted((kid, i) for kid, kw in enumerate(matcher.keyword_list)
+                  for i in range(len(text) - len(kw) + 1) if text.startswith(kw, i))
+
+def test_keyword_hits_matches_naive_search():
+    matcher = main.KeywordMatcher(FIELD_MAP)
+    rng = random.Random(0)
+    alphabet = "".join(sorted(set("".join(k for kws in FIELD_MAP.values() for k in kws)))) + " ."
+    texts = TEXTS + ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40))) for _ in range(200)]
+    for text in texts:
+        assert sorted(matcher.keyword_hits(text)) == naive_hits(matcher, text), text
+
+def test_fields_in_matches_naive_search():
+    matcher = main.KeywordMatcher(FIELD_MAP)
+    for text in TEXTS:
+        expected = {f for f, kws in FIELD_MAP.items() if any(k in text.lower() for k in kws)}
+        assert set(matcher.fields_in(text)) == expected, text
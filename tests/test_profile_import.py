@@ -0,0 +1,82 @@
+"""Streaming profile import: iter_json_array chunking and ProfileStore.import_records dedupe rules."""
+import io, json
+
+import pytest
+
+import main
+
+ARRAYS = [
+    "[]",
+    "[1, 2.5]",
+    "[1e5, -0.25, 12345678901234567890.5]",
+    '  [ {"a": 1.25e-3, "b": [1, [2]]}, "x,]", true, null, -0.5 ]  ',
+    '[{"Tài khoản": "alice", "SĐT": "0901"},\n {"Tài khoản": "bob"}]',
+]
+
+@pytest.mark.parametrize("text", ARRAYS)
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64])
+def test_iter_json_array_any_chunk_size(text, chunk_size):
+    assert list(main.iter_json_array(io.StringIO(text), chunk_size)) == json.loads(text)
+
+@pytest.mark.parametrize("text", ["[1 2]", "[1, 2", '{"a": 1}', "[1, 2.5"])
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+def test_iter_json_array_rejects_invalid(text, chunk_size):
+    with pytest.raises(ValueError):
+        list(main.iter_json_array(io.StringIO(text), chunk_size))
+
+@pytest.fixture
+def store(tmp_path):
+    s = main.ProfileStore(str(tmp_path / "profiles.db"), legacy_json=None)
+    yield s
+    s.close()
+
+def profiles(store) -> list:
+    return [p for _, p in store.iter_all()]
+
+def test_import_merges_by_account_then_phone_then_email(store):
+    store.add({"Tài khoản": "alice", "Mật khẩu": "pa", "SĐT": "0901"})
+    store.add({"SĐT": "0902", "Email": "c@x"})
+    counts = store.import_records([
+        {"Tài khoản": "alice", "Mật khẩu": "pa2"},   # cùng tài khoản -> cập nhật
+        {"SĐT": "0901", "Email": "a@x"},            # không có tài khoản, trùng SĐT -> gộp vào alice
+        {"Email": "c@x", "Họ tên": "Carl"},         # trùng email -> gộp vào hồ sơ chưa có tài khoản
+        {"Tài khoản": "alice", "Mật khẩu": "pa2"},   # không đổi gì -> bỏ qua
+        {}, "not a dict", {"Tài khoản": " "},        # rỗng / sai kiểu -> bỏ qua
+    ])
+    assert counts == {"inserted": 0, "updated": 3, "skipped": 4}
+    assert profiles(store) == [
+        {"Tài khoản": "alice", "Mật khẩu": "pa2", "SĐT": "0901", "Email": "a@x"},
+        {"SĐT": "0902", "Email": "c@x", "Họ tên": "Carl"},
+    ]
+
+def test_import_never_merges_into_another_account(store):
+    store.add({"Tài khoản": "alice", "Mật khẩu": "pa", "SĐT": "0901"})
+    store.add({"SĐT": "0902"})
+    counts = store.import_records([
+        {"Tài khoản": "bob", "Mật khẩu": "pb", "SĐT": "0901"},  # SĐT của alice nhưng khác tài khoản
+        {"Tài khoản": "carl", "SĐT": "0902"},                   # hồ sơ trùng SĐT chưa có tài khoản -> gộp
+    ])
+    assert counts == {"inserted": 1, "updated": 1, "skipped": 0}
+    assert profiles(store) == [
+        {"Tài khoản": "alice", "Mật khẩu": "pa", "SĐT": "0901"},
+        {"SĐT": "0902", "Tài khoản": "carl"},
+        {"Tài khoản": "bob", "Mật khẩu": "pb", "SĐT": "0901"},
+    ]
+
+def test_import_dedupes_within_one_stream_across_batches(store):
+    records = [{"Tài khoản": f"u{i % 250}", "Email": f"u{i}@x"} for i in range(1000)]
+    batches = []
+    counts = store.import_records(iter(records), batch=100, progress=lambda c: batches.append(dict(c)))
+    assert counts == {"inserted": 250, "updated": 750, "skipped": 0}
+    assert len(batches) == 10
+    assert store.count() == 250
+
+def test_import_export_round_trip(store, tmp_path):
+    records = [{"Tài khoản": f"u{i}", "SĐT": f"09{i:08d}", "Ghi chú": "x" * (i % 7)} for i in range(3000)]
+    src = tmp_path / "in.json"
+    src.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+    assert store.import_records(main.iter_profile_file(str(src)))["inserted"] == 3000
+
+    out = tmp_path / "out.jsonl"
+    assert store.export(str(out)) == 3000
+    assert list(main.iter_profile_file(str(out))) == records